@@ -1,5 +1,8 @@
-from django.contrib import admin
-from .models import Package, PackageImage, Itinerary
+from django import forms
+from django.contrib import admin, messages
+from .bookings import change_capacity
+from .models import Package, PackageImage, Itinerary, OutboxMessage, Departure, Booking
+from .search import search_packages
 
 class PackageImageInline(admin.TabularInline):
     model = PackageImage
@@ -19,6 +22,16 @@ class PackageAdmin(admin.ModelAdmin):
     ordering = ('-id',)
     inlines = [PackageImageInline, ItineraryInline]
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index rather than ILIKE scans over description
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        ids = [result.package_id for result in search_packages(search_term, limit=None)]
+        if not ids:
+            # Substrings inside words, or an index not built yet: fall back to icontains
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=ids), False
+
     def save_model(self, request, obj, form, change):
         if not obj.title:
             obj.title = 'Unnamed Package'
@@ -26,7 +39,7 @@ class PackageAdmin(admin.ModelAdmin):
 
 @admin.register(PackageImage)
 class PackageImageAdmin(admin.ModelAdmin):
-    list_display = ('package', 'image', 'alt_text', 'order')
+    list_display = ('package', 'image', 'alt_text', 'order', 'derivative_error')
     list_filter = ('package',)
     search_fields = ('alt_text',)
 
@@ -34,4 +47,59 @@ class PackageImageAdmin(admin.ModelAdmin):
 class ItineraryAdmin(admin.ModelAdmin):
     list_display = ('package', 'day', 'title', 'icon')
     list_filter = ('package', 'icon')
-    search_fields = ('title', 'description')
\ No newline at end of file
+    search_fields = ('title', 'description')
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+class DepartureAdminForm(forms.ModelForm):
+    class Meta:
+        model = Departure
+        # seats_remaining is only moved by api/bookings.py
+        fields = ['package', 'start_date', 'capacity']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        capacity = cleaned_data.get('capacity')
+        if self.instance.pk and capacity is not None:
+            current = Departure.objects.filter(pk=self.instance.pk).values('capacity', 'seats_remaining').first()
+            booked = current['capacity'] - current['seats_remaining'] if current else 0
+            if capacity < booked:
+                self.add_error('capacity', f'{booked} seats are already held or booked.')
+            else:
+                # What change_capacity() will leave, so the model's constraint checks hold
+                self.instance.seats_remaining = capacity - booked
+        return cleaned_data
+
+@admin.register(Departure)
+class DepartureAdmin(admin.ModelAdmin):
+    form = DepartureAdminForm
+    list_display = ('package', 'start_date', 'capacity', 'seats_remaining')
+    list_filter = ('start_date',)
+    search_fields = ('package__title',)
+    raw_id_fields = ('package',)
+    readonly_fields = ('seats_remaining',)
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        # Never write back the seats_remaining the form loaded: bookings may have moved it
+        obj.save(update_fields=[field for field in form.changed_data if field != 'capacity'])
+        if 'capacity' in form.changed_data and not change_capacity(obj.pk, obj.capacity):
+            self.message_user(
+                request, 'Capacity not changed: seats were booked meanwhile. Try again.', messages.ERROR
+            )
+        obj.refresh_from_db(fields=['capacity', 'seats_remaining'])
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'departure', 'user', 'seats', 'status', 'hold_expires_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('reference', 'user__email')
+    raw_id_fields = ('departure', 'user')
+    readonly_fields = ('reference', 'departure', 'user', 'seats', 'status', 'hold_expires_at', 'created_at')
@@ -0,0 +1,160 @@
+"""Native async versions of the public package read endpoints.
+
+Under ASGI these run on the event loop and wait on the database through
+Django's async ORM, so slow clients do not each hold a worker thread. They
+reuse the payload builder (api/payloads.py), filters, cache keys and ETags of
+the sync views in api/views.py and render with the same JSON renderer, so
+responses (and cache entries) are byte for byte the same. urls.py routes to
+them while ASYNC_PACKAGE_VIEWS is on.
+
+aserialize_packages() loads every row it needs through the async ORM before
+building payloads; a sync query from here would raise SynchronousOnlyOperation.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import NotFound
+
+from .cache import aget_catalogue_version, cached_catalogue_response, catalogue_cache_key, catalogue_cache_timeout, catalogue_etag
+from .filters import filter_packages, sort_packages
+from .models import Package
+from .pagination import KeysetPage, NumberedPage, PackageCursorPagination, PackagePagination, keyset_queryset, page_size
+from .payloads import aserialize_packages, package_values
+from .renderers import TimedJSONRenderer
+from .search import search_packages
+from .serializers import PackageFieldsSerializer, PackageFilterSerializer, PackageSearchSerializer
+
+RENDERER_FORMAT = TimedJSONRenderer.format
+CACHED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified']
+
+
+def json_response(data, status=200):
+    content = TimedJSONRenderer().render(data)
+    response = HttpResponse(content, status=status, content_type=TimedJSONRenderer.media_type)
+    response['Vary'] = 'Accept'
+    return response
+
+
+def validate_params(serializer_class, request):
+    """(validated data, None) or (None, 400 response) for the query string"""
+    serializer = serializer_class(data=request.GET)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, json_response(serializer.errors, status=400)
+
+
+async def catalogue_response(request, get_validators, build_response):
+    """Cached, conditional GET handling shared by the async catalogue views"""
+    key = catalogue_cache_key(request, RENDERER_FORMAT, await aget_catalogue_version())
+    cached = await cache.aget(key)
+    if cached is not None:
+        return cached_catalogue_response(request, cached)
+
+    last_modified, fingerprint = await get_validators()
+    etag = catalogue_etag(request, fingerprint, RENDERER_FORMAT)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = await build_response()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+    if response.status_code == 200:
+        headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+        await cache.aset(key, (response.content, headers), catalogue_cache_timeout())
+    return response
+
+
+@require_GET
+async def package_list(request):
+    """List packages with filtering, sorting and pagination (public view)"""
+
+    async def get_validators():
+        stats = await Package.objects.aaggregate(last_modified=Max('updated_at'), count=Count('id'))
+        return stats['last_modified'], f"{stats['count']}:{stats['last_modified']}"
+
+    async def build_response():
+        selection, error = validate_params(PackageFieldsSerializer, request)
+        if error:
+            return error
+        params, error = validate_params(PackageFilterSerializer, request)
+        if error:
+            return error
+
+        fields, expand = selection.get('fields'), selection.get('expand')
+        queryset = sort_packages(filter_packages(Package.objects.all(), params), params['sort'])
+        queryset = package_values(queryset, fields, expand)
+
+        size = page_size(request)
+        if PackageCursorPagination.cursor_query_param in request.GET:
+            try:
+                queryset, position, backwards = keyset_queryset(
+                    queryset, params['sort'], request.GET[PackageCursorPagination.cursor_query_param], size
+                )
+            except NotFound as e:
+                return json_response({'detail': e.detail}, status=404)
+            page = KeysetPage([row async for row in queryset], size, position, backwards)
+            results = await aserialize_packages(page.results, request, fields, expand)
+            next_url, previous_url = page.links(request.build_absolute_uri(), params['sort'])
+            return json_response({'next': next_url, 'previous': previous_url, 'results': results})
+
+        try:
+            page = NumberedPage(await queryset.acount(), request.GET.get(PackagePagination.page_query_param, 1), size)
+        except NotFound as e:
+            return json_response({'detail': e.detail}, status=404)
+        results = await aserialize_packages([row async for row in page.slice(queryset)], request, fields, expand)
+        next_url, previous_url = page.links(request.build_absolute_uri())
+        return json_response({'count': page.count, 'next': next_url, 'previous': previous_url, 'results': results})
+
+    return await catalogue_response(request, get_validators, build_response)
+
+
+@require_GET
+async def package_detail(request, pk):
+    """Get single package details (public view)"""
+
+    async def get_validators():
+        updated_at = await Package.objects.filter(pk=pk).values_list('updated_at', flat=True).afirst()
+        return updated_at, str(updated_at)
+
+    async def build_response():
+        selection, error = validate_params(PackageFieldsSerializer, request)
+        if error:
+            return error
+        fields, expand = selection.get('fields'), selection.get('expand')
+        row = await package_values(Package.objects.filter(pk=pk), fields, expand).afirst()
+        if row is None:
+            return json_response({'detail': 'No Package matches the given query.'}, status=404)
+        results = await aserialize_packages([row], request, fields, expand)
+        return json_response(results[0])
+
+    return await catalogue_response(request, get_validators, build_response)
+
+
+@require_GET
+async def package_search(request):
+    """Ranked full-text search over packages and their itineraries"""
+    params, error = validate_params(PackageSearchSerializer, request)
+    if error:
+        return error
+
+    # Ranking is CPU work on the in-memory index and may refresh it from the DB
+    results = await sync_to_async(search_packages)(params['q'], limit=params['limit'], prefix=params['prefix'])
+    return json_response({
+        'query': params['q'],
+        'results': [
+            {
+                'id': result.package_id,
+                'title': result.title,
+                'score': result.score,
+                'snippet': result.snippet,
+            }
+            for result in results
+        ]
+    })
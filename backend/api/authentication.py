@@ -0,0 +1,29 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+
+from .metrics import timed_phase
+from .tokens import denylist
+
+
+class ApiTokenUser(TokenUser):
+    """The caller as described by their access token's claims"""
+
+    @cached_property
+    def is_verified(self):
+        return self.token.get('is_verified', False)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """JWT authentication that checks the denylist instead of loading the user"""
+
+    def authenticate(self, request):
+        with timed_phase('auth'):
+            return super().authenticate(request)
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if denylist.is_revoked(token):
+            raise InvalidToken({'detail': 'Token has been revoked', 'code': 'token_revoked'})
+        return token
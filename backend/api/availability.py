@@ -0,0 +1,110 @@
+"""Departure availability for the package pages and the listing.
+
+Answers "which departures between two dates have seats for a party of N"
+from Departure.seats_remaining, which api/bookings.py keeps current, so no
+request ever counts bookings. A package's departures over the next
+AVAILABILITY_HORIZON_DAYS are cached as one entry under a per-package
+version, and requests filter that entry by date range and party size. Seat
+and departure changes bump the version once their transaction commits, so
+no reader caches the old rows under the new version (the same scheme as the
+catalogue version in api/cache.py).
+
+Bulk lookups for many packages read every entry with one get_many() and
+load the misses with one query over departure_availability_idx.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Departure
+
+DEPARTURE_COLUMNS = ['id', 'package_id', 'start_date', 'capacity', 'seats_remaining']
+
+
+def horizon_days():
+    return getattr(settings, 'AVAILABILITY_HORIZON_DAYS', 366)
+
+
+def availability_cache_timeout():
+    return getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 60 * 5)
+
+
+def version_key(package_id):
+    return f'availability:version:{package_id}'
+
+
+def get_versions(package_ids):
+    """{package id: availability version}, initialising missing ones"""
+    keys = {version_key(package_id): package_id for package_id in package_ids}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    missing = [key for key, package_id in keys.items() if package_id not in versions]
+    if missing:
+        # Seed with a timestamp so an evicted version never reuses old keys
+        seed = time.time_ns()
+        for key in missing:
+            cache.add(key, seed, timeout=None)
+        versions.update({keys[key]: version for key, version in cache.get_many(missing).items()})
+    return versions
+
+
+def bump_availability(package_ids):
+    """Invalidate the cached availability of these packages"""
+    for package_id in set(package_ids):
+        try:
+            cache.incr(version_key(package_id))
+        except ValueError:
+            cache.set(version_key(package_id), time.time_ns(), timeout=None)
+
+
+def packages_changed(package_ids):
+    """Bump these packages' availability once the current transaction commits"""
+    package_ids = set(package_ids)
+    transaction.on_commit(lambda: bump_availability(package_ids))
+
+
+def departures_changed(departure_ids):
+    """packages_changed() for the packages of these departures"""
+    packages_changed(Departure.objects.filter(pk__in=departure_ids).values_list('package_id', flat=True))
+
+
+def upcoming_departures(package_ids):
+    """{package id: its departures over the horizon, by date}, from the cache where possible"""
+    package_ids = list(dict.fromkeys(package_ids))
+    today = timezone.localdate()
+    versions = get_versions(package_ids)
+    # The date is part of the key, so entries never outlive the day they start from
+    keys = {f'availability:{package_id}:{versions.get(package_id)}:{today}': package_id for package_id in package_ids}
+    departures = {keys[key]: rows for key, rows in cache.get_many(keys).items()}
+
+    missing = [package_id for package_id in package_ids if package_id not in departures]
+    if missing:
+        loaded = {package_id: [] for package_id in missing}
+        rows = (
+            Departure.objects
+            .filter(package_id__in=missing, start_date__gt=today, start_date__lte=today + timedelta(days=horizon_days()))
+            .order_by('package_id', 'start_date')
+            .values(*DEPARTURE_COLUMNS)
+        )
+        for row in rows:
+            loaded[row.pop('package_id')].append(row)
+        cache.set_many(
+            {key: loaded[package_id] for key, package_id in keys.items() if package_id in loaded},
+            availability_cache_timeout(),
+        )
+        departures.update(loaded)
+    return departures
+
+
+def available_departures(package_ids, from_date, to_date, party_size=1):
+    """{package id: departures from from_date to to_date (inclusive) with seats for party_size}"""
+    return {
+        package_id: [
+            departure for departure in departures
+            if from_date <= departure['start_date'] <= to_date and departure['seats_remaining'] >= party_size
+        ]
+        for package_id, departures in upcoming_departures(package_ids).items()
+    }
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class EmailBackend(ModelBackend):
+    """Authenticate with email and password.
+
+    The user and their profile come back from one query on the indexed
+    auth_user.email column (see migration 0012), so login_user can build its
+    response without going back to the database.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        email = email or username
+        if not email or password is None or '@' not in email:
+            # Plain usernames (e.g. the Django admin) are left to ModelBackend
+            return None
+
+        user = (
+            UserModel._default_manager
+            .select_related('profile')
+            .filter(email=email)
+            .order_by('id')
+            .first()
+        )
+        if user is None:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
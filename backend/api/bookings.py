@@ -0,0 +1,134 @@
+"""Seat reservations on package departures.
+
+Departure.seats_remaining is only ever changed by conditional UPDATEs:
+
+    UPDATE departure SET seats_remaining = seats_remaining - n
+    WHERE id = ... AND seats_remaining >= n
+
+The database evaluates each one against the current row while holding its
+lock, so however many requests race for the last seats, each either takes
+them or matches no row. Nothing is read first and written back, and no lock
+is held longer than the reserving transaction. change_capacity() moves the
+capacity and the free seats together the same way.
+
+A reservation holds its seats as a HELD booking for BOOKING_HOLD_MINUTES.
+Confirming it within that window keeps them. Otherwise
+release_expired_holds() gives them back, either when the
+release_expired_holds command runs or when a reservation finds the
+departure full. Every status change is itself a conditional UPDATE on the
+booking's current status, so a hold that is confirmed, cancelled and
+expired at the same moment returns its seats at most once. Every seat
+change invalidates the package's cached availability (api/availability.py).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .availability import departures_changed
+from .models import Booking, Departure
+
+ACTIVE_STATUSES = ['HELD', 'CONFIRMED']
+
+
+class SeatsUnavailable(Exception):
+    """The departure has fewer seats left than requested, or has already left"""
+
+
+class BookingClosed(Exception):
+    """The booking can no longer make this transition, e.g. its hold expired"""
+
+
+def hold_duration():
+    return timedelta(minutes=getattr(settings, 'BOOKING_HOLD_MINUTES', 15))
+
+
+def take_seats(departure_id, seats):
+    """Decrement seats_remaining if at least seats are left; True if taken"""
+    taken = (
+        Departure.objects
+        .filter(pk=departure_id, seats_remaining__gte=seats, start_date__gt=timezone.localdate())
+        .update(seats_remaining=F('seats_remaining') - seats)
+    )
+    if taken:
+        departures_changed([departure_id])
+    return bool(taken)
+
+
+def return_seats(departure_id, seats):
+    Departure.objects.filter(pk=departure_id).update(seats_remaining=F('seats_remaining') + seats)
+    departures_changed([departure_id])
+
+
+def change_capacity(departure_id, capacity):
+    """Set the capacity and shift the free seats by the difference; False if booked seats exceed it"""
+    changed = (
+        Departure.objects
+        .filter(pk=departure_id, seats_remaining__gte=F('capacity') - capacity)
+        .update(capacity=capacity, seats_remaining=F('seats_remaining') + capacity - F('capacity'))
+    )
+    if changed:
+        departures_changed([departure_id])
+    return bool(changed)
+
+
+def reserve_seats(departure_id, user_id, seats, travellers=None, notes=''):
+    """Hold seats on a departure as a HELD booking; SeatsUnavailable if there are not enough"""
+    with transaction.atomic():
+        if not take_seats(departure_id, seats):
+            # Lapsed holds may be all that stands in the way
+            if not release_expired_holds([departure_id]) or not take_seats(departure_id, seats):
+                raise SeatsUnavailable()
+        return Booking.objects.create(
+            departure_id=departure_id,
+            user_id=user_id,
+            seats=seats,
+            status='HELD',
+            hold_expires_at=timezone.now() + hold_duration(),
+            travellers=travellers or [],
+            notes=notes,
+        )
+
+
+def change_status(booking, new_status, **conditions):
+    """Move the booking to new_status if it still matches conditions; True if it did"""
+    changed = Booking.objects.filter(pk=booking.pk, **conditions).update(
+        status=new_status, hold_expires_at=None, updated_at=timezone.now()
+    )
+    if changed:
+        booking.status = new_status
+        booking.hold_expires_at = None
+    return bool(changed)
+
+
+def confirm_booking(booking):
+    """Turn a live hold into a confirmed booking; BookingClosed if it expired or was cancelled"""
+    if not change_status(booking, 'CONFIRMED', status='HELD', hold_expires_at__gt=timezone.now()):
+        raise BookingClosed('This booking is no longer held.')
+    return booking
+
+
+def cancel_booking(booking):
+    """Cancel a held or confirmed booking and give its seats back"""
+    with transaction.atomic():
+        if not change_status(booking, 'CANCELLED', status__in=ACTIVE_STATUSES):
+            raise BookingClosed('This booking is not active.')
+        return_seats(booking.departure_id, booking.seats)
+    return booking
+
+
+def release_expired_holds(departure_ids=None, batch_size=500):
+    """Expire lapsed holds and return their seats; returns the number released"""
+    holds = Booking.objects.filter(status='HELD', hold_expires_at__lte=timezone.now())
+    if departure_ids is not None:
+        holds = holds.filter(departure_id__in=departure_ids)
+    released = 0
+    for booking in holds.order_by('hold_expires_at').only('id', 'departure_id', 'seats')[:batch_size]:
+        with transaction.atomic():
+            # Loses to a confirm or cancel that got there first
+            if change_status(booking, 'EXPIRED', status='HELD', hold_expires_at__lte=timezone.now()):
+                return_seats(booking.departure_id, booking.seats)
+                released += 1
+    return released
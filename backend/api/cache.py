@@ -0,0 +1,75 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, quote_etag
+
+from .routers import CATALOGUE_PIN, pin_primary
+
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+
+
+def get_catalogue_version():
+    """Current catalogue version, initialised on first use"""
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        # Seed with a timestamp so an evicted version never reuses old keys
+        cache.add(CATALOGUE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+async def aget_catalogue_version():
+    """get_catalogue_version() for async views"""
+    version = await cache.aget(CATALOGUE_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOGUE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version():
+    """Invalidate every cached catalogue response at once"""
+    # Rebuild from the primary until the replicas have caught up
+    pin_primary(CATALOGUE_PIN)
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def catalogue_cache_key(request, renderer_format, version=None):
+    """Cache key for a catalogue response under the current version"""
+    # Image and pagination URLs are absolute, so the host is part of the key
+    query = sorted(request.GET.lists())
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{query}'
+    digest = hashlib.md5(url.encode()).hexdigest()
+    if version is None:
+        version = get_catalogue_version()
+    return f'catalogue:{version}:{renderer_format}:{digest}'
+
+
+def catalogue_etag(request, fingerprint, renderer_format):
+    """Strong ETag for a catalogue response built from the given data fingerprint"""
+    # The same data renders differently per URL, host and format
+    seed = f'{fingerprint}|{request.get_host()}|{request.get_full_path()}|{renderer_format}'
+    return quote_etag(hashlib.sha1(seed.encode()).hexdigest())
+
+
+def catalogue_cache_timeout():
+    return getattr(settings, 'CATALOGUE_CACHE_TIMEOUT', 60 * 15)
+
+
+def cached_catalogue_response(request, cached):
+    """Response for a cached (content, headers) pair, or a 304 if it still matches"""
+    content, headers = cached
+    response = HttpResponse(content, headers=headers)
+    return get_conditional_response(
+        request,
+        etag=headers.get('ETag'),
+        last_modified=parse_http_date_safe(headers.get('Last-Modified')),
+        response=response,
+    ) or response
@@ -0,0 +1,195 @@
+"""Streaming import and export of the package catalogue.
+
+A record is one package with its itinerary days and image references:
+
+    {"external_id": "partner-123", "title": ..., "description": ...,
+     "duration": 14, "price": "1450.00", "altitude": "5364.00",
+     "difficulty": "TOUGH",
+     "itineraries": [{"day": 1, "title": ..., "description": ..., "icon": ...}],
+     "images": [{"image": "package_images/ebc.jpg", "alt_text": ..., "order": 0}]}
+
+JSONL files hold one record per line. CSV files hold one package per row,
+with the itineraries and images columns JSON encoded.
+
+Records are matched on external_id, so the export first gives every keyless
+package one ("pk-<id>"). Exporting and re-importing then updates packages
+in place instead of duplicating them. Images are matched on their file name
+within a package, so a re-import keeps their ids and rendered derivatives.
+"""
+import csv
+import json
+
+from django.db import transaction
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Concat
+
+from .cache import bump_catalogue_version
+from .facets import rebuild_facets
+from .images import schedule_derivatives
+from .models import Package, PackageImage, Itinerary
+from .nested import IMAGE_FIELDS, changed_rows
+from .serializers import PackageImportSerializer
+from .signals import notify_bulk_change, suppress_catalogue_signals
+
+PACKAGE_FIELDS = ['external_id', 'title', 'description', 'duration', 'price', 'altitude', 'difficulty']
+NESTED_FIELDS = ['itineraries', 'images']
+
+
+class UnreadableFile(ValueError):
+    """The file is not valid JSONL or CSV; nothing after this point was read"""
+
+
+def package_to_record(package):
+    record = {field: getattr(package, field) for field in PACKAGE_FIELDS}
+    for field in ['price', 'altitude']:
+        if record[field] is not None:
+            record[field] = str(record[field])
+    record['itineraries'] = [
+        {'day': i.day, 'title': i.title, 'description': i.description, 'icon': i.icon}
+        for i in package.itineraries.all()
+    ]
+    record['images'] = [
+        {'image': image.image.name, 'alt_text': image.alt_text, 'order': image.order}
+        for image in package.images.all()
+    ]
+    return record
+
+
+def backfill_external_ids():
+    """Key packages created without an external_id by their primary key"""
+    return Package.objects.filter(Q(external_id__isnull=True) | Q(external_id='')).update(
+        external_id=Concat(Value('pk-'), Cast('id', CharField()))
+    )
+
+
+def iter_export_records(chunk_size=500):
+    """Every package as a record, fetched chunk by chunk"""
+    backfill_external_ids()
+    packages = Package.objects.order_by('id').prefetch_related('itineraries', 'images')
+    for package in packages.iterator(chunk_size=chunk_size):
+        yield package_to_record(package)
+
+
+def write_records(records, f, file_format):
+    if file_format == 'jsonl':
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return
+    writer = csv.DictWriter(f, fieldnames=PACKAGE_FIELDS + NESTED_FIELDS)
+    writer.writeheader()
+    for record in records:
+        for field in NESTED_FIELDS:
+            record[field] = json.dumps(record[field], ensure_ascii=False)
+        writer.writerow(record)
+
+
+def read_records(f, file_format):
+    """Yield (line number, raw record) pairs without reading the whole file.
+
+    Raises UnreadableFile for malformed JSON, CSV or text encoding.
+    """
+    try:
+        yield from parse_records(f, file_format)
+    except (ValueError, csv.Error) as e:
+        raise UnreadableFile(str(e)) from e
+
+
+def parse_records(f, file_format):
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield line_number, json.loads(line)
+        return
+    reader = csv.DictReader(f)
+    for row in reader:
+        record = {field: value for field, value in row.items() if value != ''}
+        for field in NESTED_FIELDS:
+            if field in record:
+                record[field] = json.loads(record[field])
+        for field in ['external_id', 'price']:
+            record.setdefault(field, None)
+        yield reader.line_num, record
+
+
+def sync_catalogue_images(packages, records):
+    """Make the packages' images match the records, keyed by file name.
+
+    Rows whose file is still listed keep their id and derivatives and only
+    get alt text and order updated; the rest are deleted or created. Returns
+    the created rows.
+    """
+    existing, removed = {}, []
+    for image in PackageImage.objects.filter(package__in=packages):
+        key = (image.package_id, image.image.name)
+        if key in existing:
+            # A second row for the same file has nothing to match
+            removed.append(image.pk)
+        else:
+            existing[key] = image
+    submitted = {
+        (package.id, values['image']): values
+        for package, record in zip(packages, records)
+        for values in record['images']
+    }
+    removed += [image.pk for key, image in existing.items() if key not in submitted]
+    created = [
+        PackageImage(package_id=package_id, **values)
+        for (package_id, name), values in submitted.items() if (package_id, name) not in existing
+    ]
+    updated = changed_rows(existing, submitted, IMAGE_FIELDS)
+
+    if removed:
+        PackageImage.objects.filter(pk__in=removed).delete()
+    if created:
+        created = PackageImage.objects.bulk_create(created)
+    if updated:
+        PackageImage.objects.bulk_update(updated, IMAGE_FIELDS)
+    return created
+
+
+def import_batch(records, facets=True):
+    """Upsert one batch of validated records; returns the number written.
+
+    Packages are upserted on external_id with one INSERT ... ON CONFLICT.
+    Their itineraries are replaced with one DELETE and one bulk INSERT, and
+    their images diffed by sync_catalogue_images(). A multi-batch import
+    passes facets=False and calls finish_import() once at the end instead.
+    """
+    # ON CONFLICT cannot touch the same row twice, so the last duplicate wins
+    keyed = {}
+    for position, record in enumerate(records):
+        keyed[record.get('external_id') or ('row', position)] = record
+    records = list(keyed.values())
+
+    packages = [Package(**{field: record.get(field) for field in PACKAGE_FIELDS}) for record in records]
+    with transaction.atomic(), suppress_catalogue_signals():
+        packages = Package.objects.bulk_create(
+            packages,
+            update_conflicts=True,
+            unique_fields=['external_id'],
+            update_fields=[field for field in PACKAGE_FIELDS if field != 'external_id'],
+        )
+        package_ids = [package.id for package in packages]
+
+        Itinerary.objects.filter(package_id__in=package_ids).delete()
+        Itinerary.objects.bulk_create(
+            Itinerary(package_id=package.id, **itinerary)
+            for package, record in zip(packages, records)
+            for itinerary in record['itineraries']
+        )
+        for image in sync_catalogue_images(packages, records):
+            transaction.on_commit(lambda image=image: schedule_derivatives(image))
+        notify_bulk_change(package_ids, facets=facets)
+    return len(packages)
+
+
+def finish_import():
+    """Recount the facets skipped by import_batch(facets=False)"""
+    rebuild_facets()
+    bump_catalogue_version()
+
+
+def validate_record(record):
+    serializer = PackageImportSerializer(data=record)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
@@ -0,0 +1,131 @@
+"""Facet counts for the package list sidebar.
+
+Unfiltered counts come from PackageFacetCount, a summary table the Package
+signal receivers in api/signals.py adjust row by row; rebuild_facets()
+recomputes it (rebuild_package_facets command, bulk imports). Counts under
+filters are computed live in one conditional aggregate. As usual for facets,
+each facet's counts ignore that facet's own filter, so the sidebar shows what
+choosing another value would return.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from .filters import filter_conditions
+from .models import Package, PackageFacetCount
+
+# (key, lower bound inclusive, upper bound exclusive); None is unbounded
+FACET_BUCKETS = {
+    'duration': [
+        ('1-5', None, 6),
+        ('6-10', 6, 11),
+        ('11-15', 11, 16),
+        ('16-20', 16, 21),
+        ('21+', 21, None),
+    ],
+    'price': [
+        ('under-1000', None, 1000),
+        ('1000-2000', 1000, 2000),
+        ('2000-3000', 2000, 3000),
+        ('3000-5000', 3000, 5000),
+        ('5000+', 5000, None),
+    ],
+    'altitude': [
+        ('under-3000', None, 3000),
+        ('3000-4500', 3000, 4500),
+        ('4500-5500', 4500, 5500),
+        ('5500+', 5500, None),
+    ],
+}
+FACETS = ['difficulty', *FACET_BUCKETS]
+FACET_FIELDS = FACETS
+
+
+def facet_keys(values):
+    """{facet: bucket key} for a package's field values"""
+    keys = {'difficulty': values['difficulty']}
+    for facet, buckets in FACET_BUCKETS.items():
+        # Packages without a price count as free, as in the list filters
+        value = values[facet] if values[facet] is not None else 0
+        for key, lower, upper in buckets:
+            if (lower is None or value >= lower) and (upper is None or value < upper):
+                keys[facet] = key
+                break
+    return keys
+
+
+def bucket_condition(facet, key):
+    if facet == 'difficulty':
+        return Q(difficulty=key)
+    lower, upper = next((lower, upper) for k, lower, upper in FACET_BUCKETS[facet] if k == key)
+    condition = Q()
+    if lower is not None:
+        condition &= Q(**{f'{facet}__gte': lower})
+    if upper is not None:
+        condition &= Q(**{f'{facet}__lt': upper})
+    if facet == 'price' and lower is None:
+        condition |= Q(price__isnull=True)
+    return condition
+
+
+def facet_choices():
+    choices = {'difficulty': [level for level, _ in Package.DIFFICULTY_CHOICES]}
+    for facet, buckets in FACET_BUCKETS.items():
+        choices[facet] = [key for key, _, _ in buckets]
+    return choices
+
+
+def apply_facet_delta(keys, delta):
+    """Add delta to the count of each {facet: key} bucket"""
+    for facet, key in keys.items():
+        rows = PackageFacetCount.objects.filter(facet=facet, value=key)
+        if rows.update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                PackageFacetCount.objects.create(facet=facet, value=key, count=delta)
+        except IntegrityError:
+            # Another request created the row first
+            rows.update(count=F('count') + delta)
+
+
+def live_counts(params):
+    """Facet counts under the given list filters, in one query"""
+    conditions = filter_conditions(params)
+    aggregates = {'total': Count('id', filter=Q(*conditions.values()))}
+    for facet, choices in facet_choices().items():
+        others = Q(*[condition for name, condition in conditions.items() if name != facet])
+        for key in choices:
+            aggregates[f'{facet}:{key}'] = Count('id', filter=others & bucket_condition(facet, key))
+    return Package.objects.aggregate(**aggregates)
+
+
+def format_counts(flat):
+    counts = {facet: {key: flat.get(f'{facet}:{key}', 0) for key in choices} for facet, choices in facet_choices().items()}
+    counts['total'] = flat['total']
+    return counts
+
+
+def facet_counts(params):
+    """Counts per facet bucket for the validated list filters"""
+    if any(filter_conditions(params)):
+        return format_counts(live_counts(params))
+    flat = {
+        f'{facet}:{value}': count
+        for facet, value, count in PackageFacetCount.objects.values_list('facet', 'value', 'count')
+    }
+    # Every package has exactly one difficulty
+    flat['total'] = sum(flat.get(f'difficulty:{key}', 0) for key in facet_choices()['difficulty'])
+    return format_counts(flat)
+
+
+def rebuild_facets():
+    """Recompute the whole summary table from Package"""
+    with transaction.atomic():
+        flat = live_counts({})
+        PackageFacetCount.objects.all().delete()
+        PackageFacetCount.objects.bulk_create(
+            PackageFacetCount(facet=facet, value=key, count=flat[f'{facet}:{key}'])
+            for facet, choices in facet_choices().items()
+            for key in choices
+        )
+    return flat['total']
@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
+
+# Same ranks as the frontend; unknown difficulties sort as the hardest
+DIFFICULTY_RANK = {'EASY': 1, 'MEDIUM': 2, 'TOUGH': 3, 'VERY_TOUGH': 4}
+
+
+def difficulty_rank():
+    """SQL expression ranking difficulties from easiest to hardest (Package.sort_difficulty)"""
+    return Case(
+        *[When(difficulty=level, then=Value(rank)) for level, rank in DIFFICULTY_RANK.items()],
+        default=Value(len(DIFFICULTY_RANK)),
+        output_field=IntegerField(),
+    )
+
+
+def price_or_zero():
+    """SQL expression for the price, with a missing price counting as 0 (Package.sort_price)"""
+    return Coalesce(F('price'), Value(Decimal('0')), output_field=DecimalField(max_digits=8, decimal_places=2))
+
+
+# sort -> (sort column, descending). Ties break on id in the same direction,
+# so every order is one walk over a (column, id) index in Package.Meta.indexes
+# and keyset pagination can seek straight to a cursor.
+SORT_ORDERS = {
+    'latest': ('created_at', True),
+    'price-low': ('sort_price', False),
+    'price-high': ('sort_price', True),
+    'duration-short': ('duration', False),
+    'duration-long': ('duration', True),
+    'difficulty-easy': ('sort_difficulty', False),
+    'difficulty-hard': ('sort_difficulty', True),
+}
+
+
+def filter_conditions(params):
+    """The validated list filters as {facet: Q}; 'search' is not a facet"""
+    conditions = {}
+    if params.get('search'):
+        conditions['search'] = Q(title__icontains=params['search'])
+    if params.get('difficulty'):
+        conditions['difficulty'] = Q(difficulty__in=params['difficulty'])
+
+    duration = Q()
+    if params.get('min_duration') is not None:
+        duration &= Q(duration__gte=params['min_duration'])
+    if params.get('max_duration') is not None:
+        duration &= Q(duration__lte=params['max_duration'])
+
+    # Packages without a price behave as if they cost 0
+    price = Q()
+    if params.get('min_price'):
+        price &= Q(price__gte=params['min_price'])
+    if params.get('max_price') is not None:
+        price &= Q(price__lte=params['max_price']) | Q(price__isnull=True)
+
+    altitude = Q()
+    if params.get('min_altitude') is not None:
+        altitude &= Q(altitude__gte=params['min_altitude'])
+    if params.get('max_altitude') is not None:
+        altitude &= Q(altitude__lte=params['max_altitude'])
+
+    for facet, condition in [('duration', duration), ('price', price), ('altitude', altitude)]:
+        if condition:
+            conditions[facet] = condition
+    return conditions
+
+
+def filter_packages(queryset, params):
+    """Apply the validated list filters to a Package queryset"""
+    for condition in filter_conditions(params).values():
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def sort_packages(queryset, sort_by):
+    """Order a Package queryset by one of the SORT_ORDERS keys.
+
+    The sort key is annotated as sort_value, which keyset pagination reads
+    back even when ?fields= defers the underlying column.
+    """
+    column, descending = SORT_ORDERS[sort_by]
+    queryset = queryset.annotate(sort_value=F(column))
+    if descending:
+        return queryset.order_by('-sort_value', '-id')
+    return queryset.order_by('sort_value', 'id')
+
+
+def seek_packages(queryset, sort_by, position, backwards=False):
+    """Packages of a sort_packages() queryset after (or before) a (sort value, id) position"""
+    _, descending = SORT_ORDERS[sort_by]
+    value, pk = position
+    if backwards:
+        queryset = queryset.reverse()
+    # The leading range bound is what lets the database seek into the index
+    if descending != backwards:
+        return queryset.filter(Q(sort_value__lte=value) & (Q(sort_value__lt=value) | Q(id__lt=pk)))
+    return queryset.filter(Q(sort_value__gte=value) & (Q(sort_value__gt=value) | Q(id__gt=pk)))
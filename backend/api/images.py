@@ -0,0 +1,167 @@
+"""Responsive derivatives for package images.
+
+Every uploaded original gets resized WebP and JPEG variants, a tiny blurred
+placeholder (as a data URI) and its dominant colour. The Pillow work runs in
+a process pool so neither the upload request nor the GIL is held up by it.
+
+render_derivatives() is the part that runs in the pool: it only reads and
+writes files through the default storage and never touches the database.
+An image whose rendering fails keeps no variants and gets derivative_error
+set; generate_image_derivatives picks it up again.
+"""
+import atexit
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageFilter, ImageOps
+
+from .models import PackageImage
+from .routers import use_primary
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_FIELDS = ['width', 'height', 'variants', 'placeholder', 'dominant_color']
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def derivative_widths():
+    return getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', [320, 640, 1024, 1600])
+
+
+def derivative_name(name, width, extension):
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    return posixpath.join(posixpath.dirname(name), 'derivatives', f'{stem}-{width}.{extension}')
+
+
+def placeholder_data_uri(image):
+    thumb = image.copy()
+    thumb.thumbnail((16, 16))
+    thumb = thumb.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    thumb.save(buffer, 'WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def dominant_color(image):
+    palette_image = image.resize((64, 64)).quantize(colors=5)
+    count, index = max(palette_image.getcolors())
+    red, green, blue = palette_image.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def render_derivatives(name):
+    """Create every variant of one stored original; returns the field values"""
+    with default_storage.open(name) as f:
+        image = ImageOps.exif_transpose(Image.open(f))
+        image = image.convert('RGB')
+
+    width, height = image.size
+    widths = [w for w in derivative_widths() if w < width] or [width]
+    variants = []
+    try:
+        for target in widths:
+            resized = image if target == width else image.resize(
+                (target, round(height * target / width)), Image.Resampling.LANCZOS
+            )
+            for extension, options in FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, **options)
+                stored = derivative_name(name, target, extension)
+                if default_storage.exists(stored):
+                    default_storage.delete(stored)
+                stored = default_storage.save(stored, ContentFile(buffer.getvalue()))
+                variants.append({'format': extension, 'width': target, 'name': stored})
+    except Exception:
+        # All or nothing: no variant files are left behind for a failed image
+        for variant in variants:
+            default_storage.delete(variant['name'])
+        raise
+
+    return {
+        'width': width,
+        'height': height,
+        'variants': variants,
+        'placeholder': placeholder_data_uri(image),
+        'dominant_color': dominant_color(image),
+    }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=None, replace_broken=False):
+    """Shared pool; spawned workers run django.setup() to use the storage"""
+    global _executor
+    with _executor_lock:
+        if replace_broken and _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers or getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', None) or max(1, (os.cpu_count() or 2) // 2),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+            atexit.register(_executor.shutdown, wait=False)
+        return _executor
+
+
+def apply_derivatives(image, result):
+    for field in DERIVATIVE_FIELDS:
+        setattr(image, field, result[field])
+    image.derivative_error = ''
+    # A regular save so the catalogue cache and updated_at follow (api/signals.py)
+    image.save(update_fields=DERIVATIVE_FIELDS + ['derivative_error'])
+
+
+def record_derivative_failure(image_id, error):
+    """Mark the image as failed; generate_image_derivatives retries it"""
+    PackageImage.objects.filter(pk=image_id).update(derivative_error=str(error)[:500] or type(error).__name__)
+
+
+def schedule_derivatives(image):
+    """Render an image's derivatives in the pool and store them when done"""
+    image_id = image.pk
+
+    def on_done(future):
+        # Runs on an executor thread, which opens its own DB connection
+        try:
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.exception('Failed to render derivatives for image %s', image_id)
+                record_derivative_failure(image_id, e)
+            else:
+                # The row was committed moments ago and may not be on a replica yet
+                with use_primary():
+                    image = PackageImage.objects.get(pk=image_id)
+                apply_derivatives(image, result)
+        except Exception:
+            logger.exception('Failed to store derivatives for image %s', image_id)
+        finally:
+            connection.close()
+
+    try:
+        future = get_executor().submit(render_derivatives, image.image.name)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool
+        future = get_executor(replace_broken=True).submit(render_derivatives, image.image.name)
+    future.add_done_callback(on_done)
+    return future
@@ -0,0 +1,174 @@
+import io
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from api.models import Booking, Departure, Package
+from api.signals import suppress_catalogue_signals
+from api.tokens import issue_tokens
+
+PREFIX = 'bookingbench-'
+
+
+class Command(BaseCommand):
+    help = 'Fire parallel reservations at one departure through the WSGI handler and check nothing is oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacity', type=int, default=40, help='Seats on the departure')
+        parser.add_argument('--requests', type=int, default=400, help='Reservations per round')
+        parser.add_argument('--concurrency', type=int, default=50, help='Worker threads, released together')
+        parser.add_argument('--max-seats', type=int, default=3, help='Each request asks for 1 to this many seats')
+        parser.add_argument('--users', type=int, default=50, help='Users the requests rotate through')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the seat counts')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        # Worker threads need committed rows, so seed for real and clean up after
+        self.cleanup()
+        try:
+            self.seed(options['capacity'], options['users'])
+            self.handler = WSGIHandler()
+            rounds = [
+                ('rush', self.run_round(options['requests'], options['concurrency'], options['max_seats'])),
+                ('cancel', self.cancel_some()),
+            ]
+            self.check_seats('after rush and cancellations')
+            # Lapse every hold: the next rush has to release them to get anywhere
+            Booking.objects.filter(departure=self.departure, status='HELD').update(
+                hold_expires_at=timezone.now() - timedelta(seconds=1)
+            )
+            rounds.append(('rush after expiry', self.run_round(options['requests'], options['concurrency'], options['max_seats'])))
+            self.check_seats('after expiry')
+        finally:
+            self.cleanup()
+
+        for name, result in rounds:
+            self.stdout.write(f'{name}: ' + json.dumps(result))
+        failed = sum(count for name, result in rounds for status, count in result['statuses'].items() if int(status) >= 500)
+        if failed:
+            raise CommandError(f'{failed} requests failed with a server error')
+        self.stdout.write(self.style.SUCCESS('No departure was oversold'))
+
+    def seed(self, capacity, user_count):
+        with transaction.atomic(), suppress_catalogue_signals():
+            package = Package.objects.create(
+                external_id=f'{PREFIX}package', title='Booking benchmark trek', description='Everest Base Camp.',
+                duration=14, price=Decimal('1450.00'), altitude=Decimal('5364.00'), difficulty='TOUGH',
+            )
+            self.departure = Departure.objects.create(
+                package=package, start_date=timezone.localdate() + timedelta(days=30), capacity=capacity
+            )
+            users = User.objects.bulk_create(
+                User(username=f'{PREFIX}{i}@example.com', email=f'{PREFIX}{i}@example.com') for i in range(user_count)
+            )
+        self.capacity = capacity
+        self.tokens = {user.id: issue_tokens(user)['access'] for user in users}
+
+    def cleanup(self):
+        with transaction.atomic(), suppress_catalogue_signals():
+            Booking.objects.filter(departure__package__external_id__startswith=PREFIX).delete()
+            Package.objects.filter(external_id__startswith=PREFIX).delete()
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+    def call(self, method, path, body, token):
+        """Send one request through the WSGI handler; returns (status, seconds)"""
+        payload = json.dumps(body).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'HTTP_HOST': 'localhost',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.input': io.BytesIO(payload),
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        started = time.perf_counter()
+        response = self.handler(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return statuses[0], time.perf_counter() - started
+
+    def run_round(self, request_count, concurrency, max_seats):
+        path = reverse('reserve_departure', args=[self.departure.id])
+        tokens = list(self.tokens.values())
+        requests = [(self.random.randint(1, max_seats), tokens[i % len(tokens)]) for i in range(request_count)]
+        # Every worker waits here, so the first requests really do collide
+        barrier = threading.Barrier(concurrency)
+        lock = threading.Lock()
+        samples = []
+
+        def worker(offset):
+            try:
+                barrier.wait()
+                for seats, token in requests[offset::concurrency]:
+                    status, seconds = self.call('POST', path, {'seats': seats}, token)
+                    with lock:
+                        samples.append((status, seconds, seats))
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+        statuses = {}
+        for status, _, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))], 2)
+
+        return {
+            'requests': len(samples),
+            'statuses': statuses,
+            'seats_granted': sum(seats for status, _, seats in samples if status == 201),
+            'requests_per_second': round(len(samples) / elapsed, 1),
+            'p50_ms': percentile(50),
+            'p99_ms': percentile(99),
+        }
+
+    def cancel_some(self):
+        """Cancel every third live booking through the API"""
+        bookings = list(Booking.objects.filter(departure=self.departure, status='HELD').values_list('reference', 'user_id'))[::3]
+        statuses = {}
+        for reference, user_id in bookings:
+            status, _ = self.call('POST', reverse('cancel_booking', args=[reference]), {}, self.tokens[user_id])
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {'cancelled': len(bookings), 'statuses': statuses}
+
+    def check_seats(self, label):
+        """Held and confirmed seats plus the free ones must add up to the capacity, exactly"""
+        self.departure.refresh_from_db()
+        booked = Booking.objects.filter(departure=self.departure, status__in=['HELD', 'CONFIRMED']).aggregate(
+            seats=Sum('seats')
+        )['seats'] or 0
+        remaining = self.departure.seats_remaining
+        self.stdout.write(f'{label}: {booked} seats booked, {remaining} free, capacity {self.capacity}')
+        if booked > self.capacity or remaining < 0:
+            raise CommandError(f'Oversold {label}: {booked} seats booked on a departure of {self.capacity}')
+        if booked + remaining != self.capacity:
+            raise CommandError(f'Seat count drifted {label}: {booked} booked + {remaining} free != {self.capacity}')
@@ -0,0 +1,92 @@
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import UserProfile
+
+PASSWORD = 'Benchmark-Passw0rd!'
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput per core for each configured password hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=2, help='Time spent verifying per hasher')
+        parser.add_argument('--target', type=float, default=50, help='Peak logins per second to size cores for')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests against the login endpoint')
+
+    def handle(self, *args, **options):
+        self.benchmark_hashers(options['seconds'], options['target'])
+        self.benchmark_endpoint(options['repeat'])
+
+    def benchmark_hashers(self, seconds, target):
+        # Hashing is CPU bound and holds the GIL, so one process is one core
+        self.stdout.write(f"{'hasher':<44}{'ms/login':>10}{'logins/s/core':>16}{'cores':>8}")
+        for hasher in get_hashers():
+            name = f'{hasher.algorithm} ({type(hasher).__name__})'
+            try:
+                encoded = hasher.encode(PASSWORD, hasher.salt())
+            except (ValueError, TypeError) as e:
+                # e.g. argon2-cffi or bcrypt is not installed
+                self.stdout.write(f'{name:<44}  unavailable: {e}')
+                continue
+
+            verifications = 0
+            started = time.perf_counter()
+            while True:
+                hasher.verify(PASSWORD, encoded)
+                verifications += 1
+                elapsed = time.perf_counter() - started
+                if elapsed >= seconds:
+                    break
+            per_second = verifications / elapsed
+            cores = math.ceil(target / per_second)
+            self.stdout.write(f'{name:<44}{1000 / per_second:>10.2f}{per_second:>16.1f}{cores:>8}')
+        self.stdout.write(f'cores = cores needed for {target:g} logins/s at 100% CPU on hashing alone')
+
+    def benchmark_endpoint(self, repeat):
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                email = 'benchmark-login@example.com'
+                user = User.objects.create_user(username=email, email=email, password=PASSWORD)
+                UserProfile.objects.create(user=user, full_name='Benchmark User')
+                self.run_logins(email, repeat)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+    def run_logins(self, email, repeat):
+        client = APIClient()
+        url = reverse('login')
+        payload = {'email': email, 'password': PASSWORD}
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # The first login creates the token; measure a returning user
+        client.post(url, payload, format='json')
+        with connection.execute_wrapper(count_query):
+            response = client.post(url, payload, format='json')
+        if response.status_code != 200:
+            self.stderr.write(f'login: HTTP {response.status_code} {response.data}')
+            return
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            client.post(url, payload, format='json')
+        elapsed_ms = (time.perf_counter() - started) * 1000 / max(repeat, 1)
+        self.stdout.write(
+            f'POST {url} with {settings.PASSWORD_HASHERS[0].rsplit(".", 1)[-1]}: '
+            f'{len(queries)} queries, {elapsed_ms:.2f} ms avg'
+        )
@@ -0,0 +1,128 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.cache import bump_catalogue_version
+from api.filters import seek_packages, sort_packages
+from api.models import Package, PackageImage, Itinerary
+
+
+class Command(BaseCommand):
+    help = 'Seed a package catalogue and report query count and wall time per package endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=100, help='Number of packages to seed')
+        parser.add_argument('--related', type=int, default=10, help='Images and itinerary days per package')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per endpoint')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows instead of rolling back')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                package_ids, admin = self.seed(options['packages'], options['related'])
+                self.run_benchmarks(package_ids, admin, options['repeat'])
+                self.run_page_depths(options['repeat'])
+                if not options['keep']:
+                    transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+    def seed(self, package_count, related_count):
+        packages = Package.objects.bulk_create(
+            Package(
+                title=f'Benchmark Trek {i}',
+                description='Benchmark package description. ' * 20,
+                duration=related_count or 1,
+                price=1000 + i,
+                altitude=5000,
+                difficulty='MEDIUM',
+            )
+            for i in range(package_count)
+        )
+        PackageImage.objects.bulk_create(
+            PackageImage(package=package, image=f'package_images/benchmark_{n}.jpg', order=n)
+            for package in packages
+            for n in range(related_count)
+        )
+        Itinerary.objects.bulk_create(
+            Itinerary(package=package, day=n + 1, title=f'Day {n + 1}', description='Walk. ' * 30)
+            for package in packages
+            for n in range(related_count)
+        )
+        admin = User.objects.create_user(username='benchmark-admin', is_staff=True)
+        self.stdout.write(
+            f'Seeded {package_count} packages with {related_count} images and itinerary days each'
+        )
+        return [package.id for package in packages], admin
+
+    def run_benchmarks(self, package_ids, admin, repeat):
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        first_id = package_ids[0]
+        endpoints = [
+            ('package_list', reverse('package_list') + '?page_size=100'),
+            ('package_detail', reverse('package_detail', args=[first_id])),
+            ('package_admin_list', reverse('package_admin_list')),
+            ('package_admin_detail', reverse('package_admin_detail', args=[first_id])),
+        ]
+
+        def timed(url, cold):
+            elapsed = 0
+            for _ in range(repeat):
+                if cold:
+                    # A new catalogue version misses every cached response
+                    bump_catalogue_version()
+                started = time.perf_counter()
+                client.get(url)
+                elapsed += time.perf_counter() - started
+            return elapsed * 1000 / max(repeat, 1)
+
+        self.stdout.write(f"{'endpoint':<24}{'queries':>10}{'cold ms':>12}{'warm ms':>12}")
+        for name, url in endpoints:
+            # request_started resets connection.queries, so count with a wrapper
+            queries = []
+
+            def count_query(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            bump_catalogue_version()
+            with connection.execute_wrapper(count_query):
+                response = client.get(url)
+            if response.status_code != 200:
+                self.stderr.write(f'{name}: HTTP {response.status_code}')
+                continue
+
+            cold_ms = timed(url, cold=True)
+            # Cached responses for the public views; the admin views are never cached
+            warm_ms = timed(url, cold=False)
+            self.stdout.write(f'{name:<24}{len(queries):>10}{cold_ms:>12.2f}{warm_ms:>12.2f}')
+        self.stdout.write('queries and cold ms are for a cache miss, warm ms for repeats under the same catalogue version')
+
+    def run_page_depths(self, repeat, size=10):
+        """Time fetching one page by OFFSET and by keyset seek at increasing depth"""
+        queryset = sort_packages(Package.objects.only('id'), 'latest')
+        count = queryset.count()
+
+        def timed(fetch):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(fetch())
+            return (time.perf_counter() - started) * 1000 / max(repeat, 1)
+
+        self.stdout.write(f"\n{'page depth':<24}{'offset ms':>12}{'keyset ms':>12}")
+        for depth in sorted({0, count // 2, max(count - size, 0)}):
+            if depth:
+                last = queryset[depth - 1]
+                after = (last.sort_value, last.id)
+                keyset = lambda: seek_packages(queryset, 'latest', after)[:size + 1]
+            else:
+                keyset = lambda: queryset[:size + 1]
+            offset_ms = timed(lambda: queryset[depth:depth + size])
+            self.stdout.write(f'{depth:<24}{offset_ms:>12.2f}{timed(keyset):>12.2f}')
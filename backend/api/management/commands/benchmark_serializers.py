@@ -0,0 +1,100 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.filters import sort_packages
+from api.models import Package, PackageImage, Itinerary
+from api.payloads import package_values, serialize_packages
+from api.serializers import PackageSerializer
+
+PREFIX = 'Serializer Benchmark '
+
+
+class Command(BaseCommand):
+    help = 'Time api/payloads.py against PackageSerializer (api.tests checks they match)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Packages per run')
+        parser.add_argument('--images', type=int, default=3, help='Images per package')
+        parser.add_argument('--days', type=int, default=8, help='Itinerary days per package')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                self.seed(max(options['sizes']), options['images'], options['days'])
+                self.request = RequestFactory().get('/api/packages/')
+                self.run_benchmarks(options['sizes'], options['repeat'])
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+    def seed(self, package_count, image_count, day_count):
+        packages = Package.objects.bulk_create(
+            Package(
+                title=f'{PREFIX}{i}',
+                description='Teahouse trek through rhododendron forest and high passes. ' * 8,
+                duration=day_count or 1,
+                # Some packages have no price, which renders as null
+                price=None if i % 7 == 0 else Decimal(f'{900 + i % 4000}.5'),
+                altitude=Decimal(3000 + i % 2500),
+                difficulty=['EASY', 'MEDIUM', 'TOUGH', 'VERY_TOUGH'][i % 4],
+            )
+            for i in range(package_count)
+        )
+        PackageImage.objects.bulk_create(
+            PackageImage(
+                package=package,
+                image=f'package_images/benchmark_{n}.jpg',
+                alt_text=f'View {n}',
+                # Equal orders exercise the id tie-break
+                order=n // 2,
+                width=1600,
+                height=1067,
+                variants=[
+                    {'name': f'package_images/derivatives/benchmark_{n}_{width}.{image_format}', 'format': image_format, 'width': width}
+                    for image_format in ['webp', 'jpeg']
+                    for width in [320, 640, 1024]
+                ],
+                placeholder='data:image/jpeg;base64,AAAA',
+                dominant_color='#5a7d3c',
+            )
+            for package in packages
+            for n in range(image_count)
+        )
+        Itinerary.objects.bulk_create(
+            Itinerary(package=package, day=n + 1, title=f'Day {n + 1}', description='Walk to the next village. ' * 6)
+            for package in packages
+            for n in range(day_count)
+        )
+        self.stdout.write(f'Seeded {package_count} packages with {image_count} images and {day_count} days each')
+
+    def queryset(self, size):
+        return sort_packages(Package.objects.filter(title__startswith=PREFIX), 'latest')[:size]
+
+    def drf_payload(self, size):
+        packages = self.queryset(size).prefetch_related('images', 'itineraries')
+        return PackageSerializer(packages, many=True, context={'request': self.request}).data
+
+    def fast_payload(self, size):
+        return serialize_packages(package_values(self.queryset(size)), self.request)
+
+    def run_benchmarks(self, sizes, repeat):
+        def best_ms(build, size):
+            timings = []
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                build(size)
+                timings.append((time.perf_counter() - started) * 1000)
+            return min(timings)
+
+        self.stdout.write(f"{'packages':<12}{'serializer ms':>16}{'payloads ms':>16}{'speedup':>10}")
+        for size in sizes:
+            drf_ms = best_ms(self.drf_payload, size)
+            fast_ms = best_ms(self.fast_payload, size)
+            self.stdout.write(f'{size:<12}{drf_ms:>16.1f}{fast_ms:>16.1f}{drf_ms / fast_ms:>9.1f}x')
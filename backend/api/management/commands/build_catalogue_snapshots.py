@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.snapshots import brotli, snapshot_dir, write_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Write the package list and detail JSON, with gzip and brotli variants, as static files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write the snapshots here instead of CATALOGUE_SNAPSHOT_DIR')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        directory = options['output'] or snapshot_dir()
+        written, removed = write_snapshots(directory=directory)
+        if brotli is None:
+            self.stderr.write('brotli is not installed; only gzip variants were written')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} and removed {removed} snapshot files in {directory} '
+            f'in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.search import build_index, index_path, save_index
+
+
+class Command(BaseCommand):
+    help = 'Build the package full-text search index and write it to SEARCH_INDEX_PATH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write the index here instead of SEARCH_INDEX_PATH')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = build_index()
+        path = options['output'] or index_path()
+        save_index(index, path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index)} packages ({len(index.terms)} terms) into {path} '
+            f'in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,23 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api.catalogue import iter_export_records, write_records
+
+
+class Command(BaseCommand):
+    help = 'Stream the package catalogue, with itineraries and image references, to JSONL or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+        parser.add_argument('--output', help='File to write (default stdout)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Packages fetched per query')
+
+    def handle(self, *args, **options):
+        records = iter_export_records(chunk_size=options['chunk_size'])
+        if not options['output']:
+            write_records(records, sys.stdout, options['format'])
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+            write_records(records, f, options['format'])
+        self.stderr.write(f"Exported catalogue to {options['output']}")
@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from api.images import apply_derivatives, get_executor, record_derivative_failure, render_derivatives
+from api.models import PackageImage
+
+
+class Command(BaseCommand):
+    help = 'Render responsive derivatives for existing package images in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render images that already have derivatives')
+        parser.add_argument('--workers', type=int, help='Worker processes (default IMAGE_DERIVATIVE_WORKERS)')
+
+    def handle(self, *args, **options):
+        images = PackageImage.objects.all()
+        if not options['all']:
+            # Includes images whose last render failed (derivative_error set)
+            images = images.filter(variants=[])
+        images = {image.pk: image for image in images.only('id', 'package_id', 'image')}
+        if not images:
+            self.stdout.write('No images to process')
+            return
+
+        started = time.perf_counter()
+        executor = get_executor(options['workers'])
+        futures = {executor.submit(render_derivatives, image.image.name): pk for pk, image in images.items()}
+        done = failed = 0
+        for future in as_completed(futures):
+            image = images[futures[future]]
+            try:
+                apply_derivatives(image, future.result())
+                done += 1
+            except Exception as e:
+                failed += 1
+                record_derivative_failure(image.pk, e)
+                self.stderr.write(f'{image.image.name}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered derivatives for {done} images ({failed} failed) in {time.perf_counter() - started:.1f}s'
+        ))
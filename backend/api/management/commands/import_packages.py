@@ -0,0 +1,49 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from api.catalogue import UnreadableFile, finish_import, import_batch, read_records, validate_record
+
+
+class Command(BaseCommand):
+    help = 'Import packages from JSONL or CSV, upserting on external_id in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=500, help='Packages written per transaction')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        started = time.perf_counter()
+        imported = skipped = 0
+        batch = []
+
+        with open(path, newline='', encoding='utf-8') as f:
+            try:
+                for line_number, record in read_records(f, file_format):
+                    try:
+                        batch.append(validate_record(record))
+                    except serializers.ValidationError as e:
+                        skipped += 1
+                        self.stderr.write(f'Line {line_number}: {json.dumps(e.detail)}')
+                        continue
+                    if len(batch) >= options['batch_size']:
+                        imported += import_batch(batch, facets=False)
+                        batch = []
+                if batch:
+                    imported += import_batch(batch, facets=False)
+            except UnreadableFile as e:
+                raise CommandError(f'Could not parse {path}: {e}')
+            finally:
+                if imported:
+                    # Once for the whole file rather than per batch
+                    finish_import()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} packages, skipped {skipped} invalid records '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
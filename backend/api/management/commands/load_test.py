@@ -0,0 +1,234 @@
+import io
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from wsgiref.util import setup_testing_defaults
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.urls import reverse
+
+from api.cache import bump_catalogue_version
+from api.facets import rebuild_facets
+from api.models import Package, PackageImage, Itinerary, UserProfile
+from api.signals import suppress_catalogue_signals
+from api.tokens import issue_tokens
+
+PREFIX = 'loadtest-'
+PASSWORD = 'Loadtest-Passw0rd!'
+SCENARIOS = ['package_list', 'package_detail', 'login', 'profile', 'admin_create', 'admin_update']
+
+
+class Command(BaseCommand):
+    help = 'Seed a catalogue and users, then load test the API through the WSGI handler and print JSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Users to seed (login rotates through them)')
+        parser.add_argument('--packages', type=int, default=200, help='Packages to seed')
+        parser.add_argument('--related', type=int, default=8, help='Images and itinerary days per package')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Run only these scenarios')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed, so runs pick the same URLs')
+        parser.add_argument('--output', help='Also write the JSON results to this file')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        # Worker threads need committed rows, so seed for real and clean up after
+        self.cleanup()
+        try:
+            self.seed(options['users'], options['packages'], options['related'])
+            self.handler = WSGIHandler()
+            results = {
+                scenario: self.run_scenario(scenario, options['requests'], options['concurrency'])
+                for scenario in options['scenario'] or SCENARIOS
+            }
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+        report = {'environment': self.environment(options), 'scenarios': results}
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+
+    def environment(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'django': django.get_version(),
+            'database': connection.vendor,
+            **{name: options[name] for name in ['users', 'packages', 'related', 'requests', 'concurrency', 'seed']},
+        }
+
+    def seed(self, user_count, package_count, related_count):
+        difficulties = [choice for choice, _ in Package.DIFFICULTY_CHOICES]
+        with transaction.atomic(), suppress_catalogue_signals():
+            packages = Package.objects.bulk_create(
+                Package(
+                    external_id=f'{PREFIX}{i}',
+                    title=f'Load test trek {i}',
+                    description='Teahouse trek through rhododendron forest and high passes. ' * 10,
+                    duration=self.random.randint(3, 25),
+                    price=Decimal(self.random.randint(300, 5000)),
+                    altitude=Decimal(self.random.randint(2000, 6500)),
+                    difficulty=self.random.choice(difficulties),
+                )
+                for i in range(package_count)
+            )
+            PackageImage.objects.bulk_create(
+                PackageImage(package=package, image=f'package_images/{PREFIX}{n}.jpg', order=n)
+                for package in packages
+                for n in range(related_count)
+            )
+            Itinerary.objects.bulk_create(
+                Itinerary(package=package, day=n + 1, title=f'Day {n + 1}', description='Walk to the next village. ' * 8)
+                for package in packages
+                for n in range(related_count)
+            )
+
+            # One hash shared by every user keeps seeding fast
+            password = make_password(PASSWORD)
+            users = User.objects.bulk_create(
+                User(username=f'{PREFIX}{i}@example.com', email=f'{PREFIX}{i}@example.com', password=password)
+                for i in range(user_count)
+            )
+            UserProfile.objects.bulk_create(UserProfile(user=user, full_name=f'Load Tester {i}') for i, user in enumerate(users))
+            admin = User.objects.create_user(username=f'{PREFIX}admin', email=f'{PREFIX}admin@example.com', is_staff=True)
+            UserProfile.objects.create(user=admin)
+            rebuild_facets()
+        bump_catalogue_version()
+
+        self.package_ids = [package.id for package in packages]
+        self.users = [(user, issue_tokens(user)['access']) for user in users]
+        self.admin_token = issue_tokens(admin)['access']
+        self.login_counter = iter(range(10 ** 9))
+
+    def cleanup(self):
+        with transaction.atomic(), suppress_catalogue_signals():
+            Package.objects.filter(external_id__startswith=PREFIX).delete()
+            Package.objects.filter(title__startswith='Load test created').delete()
+            User.objects.filter(username__startswith=PREFIX).delete()
+            rebuild_facets()
+        bump_catalogue_version()
+
+    def build_request(self, scenario):
+        """(method, path, query string, JSON body, token, client address) for one request"""
+        user_index = self.random.randrange(len(self.users))
+        user, token = self.users[user_index]
+        # One address per user, so per-IP throttles see many clients
+        address = f'10.{user_index // 65536 % 256}.{user_index // 256 % 256}.{user_index % 256}'
+        package_id = self.random.choice(self.package_ids)
+        if scenario == 'package_list':
+            sort = self.random.choice(['latest', 'price-low', 'duration-short', 'difficulty-easy'])
+            page = self.random.randint(1, max(1, len(self.package_ids) // 20))
+            return 'GET', reverse('package_list'), f'sort={sort}&page={page}&page_size=20', None, None, address
+        if scenario == 'package_detail':
+            return 'GET', reverse('package_detail', args=[package_id]), '', None, None, address
+        if scenario == 'login':
+            # Rotate users so per-email throttles are not what is measured
+            user, _ = self.users[next(self.login_counter) % len(self.users)]
+            body = {'email': user.email, 'password': PASSWORD}
+            return 'POST', reverse('login'), '', body, None, address
+        if scenario == 'profile':
+            body = {'full_name': f'Load Tester {user_index}', 'country': 'Nepal'}
+            return 'PUT', reverse('update_profile'), '', body, token, address
+        if scenario == 'admin_create':
+            body = {
+                'title': f'Load test created {self.random.randrange(10 ** 9)}',
+                'description': 'Created by the load test.',
+                'duration': 12, 'price': '1500.00', 'altitude': '5000.00', 'difficulty': 'MEDIUM',
+            }
+            return 'POST', reverse('package_admin_list'), '', body, self.admin_token, address
+        body = {'price': f'{self.random.randint(300, 5000)}.00'}
+        return 'PATCH', reverse('package_admin_detail', args=[package_id]), '', body, self.admin_token, address
+
+    def call(self, method, path, query, body, token, address):
+        """Send one request through the WSGI handler; returns (status, seconds, queries)"""
+        payload = json.dumps(body).encode() if body is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'HTTP_HOST': 'localhost',
+            'REMOTE_ADDR': address,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.input': io.BytesIO(payload),
+        }
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        setup_testing_defaults(environ)
+
+        statuses = []
+        queries = [0]
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        # connection is this worker thread's own connection
+        with connection.execute_wrapper(count_query):
+            response = self.handler(environ, start_response)
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+        return statuses[0], time.perf_counter() - started, queries[0]
+
+    def run_scenario(self, scenario, request_count, concurrency):
+        requests = [self.build_request(scenario) for _ in range(request_count)]
+        lock = threading.Lock()
+        samples = []
+
+        def worker(request):
+            result = self.call(*request)
+            with lock:
+                samples.append(result)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, requests))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+        statuses = {}
+        for status, _, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))], 2)
+
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for status, _, _ in samples if status >= 400),
+            'statuses': statuses,
+            'requests_per_second': round(len(samples) / elapsed, 1),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'p50_ms': percentile(50),
+            'p95_ms': percentile(95),
+            'p99_ms': percentile(99),
+            'queries_per_request': round(sum(q for _, _, q in samples) / len(samples), 2),
+        }
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import EmailVerificationToken, PasswordResetToken, RevokedToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired or used verification, password reset and revoked JWT rows in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        sweeps = [
+            ('email verification tokens', EmailVerificationToken.objects.filter(expires_at__lte=now)),
+            ('password reset tokens', PasswordResetToken.objects.filter(Q(expires_at__lte=now) | Q(used=True))),
+            ('revoked JWTs', RevokedToken.objects.filter(expires_at__lte=now)),
+        ]
+        for label, queryset in sweeps:
+            deleted = self.delete_in_batches(queryset, options['batch_size'], options['pause'])
+            self.stdout.write(f'Deleted {deleted} {label}')
+
+    def delete_in_batches(self, queryset, batch_size, pause):
+        # Each DELETE runs in its own short autocommit transaction, so no
+        # statement holds row locks on more than batch_size rows
+        total = 0
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return total
+            deleted, _ = queryset.model.objects.filter(id__in=ids).delete()
+            total += deleted
+            if len(ids) < batch_size:
+                return total
+            time.sleep(pause)
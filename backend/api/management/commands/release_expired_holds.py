@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.bookings import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Expire unconfirmed seat holds past their deadline and return the seats to their departures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Holds released per pass')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            released = release_expired_holds(batch_size=options['batch_size'])
+            total += released
+            if released < options['batch_size']:
+                break
+        self.stdout.write(f'Released {total} expired holds')
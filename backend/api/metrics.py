@@ -0,0 +1,122 @@
+"""In-process request metrics.
+
+RequestTimingMiddleware (api/middleware.py) times every request and splits
+it into phases: auth (StatelessJWTAuthentication), db (every query, through
+a connection execute wrapper), render (TimedJSONRenderer) and view, which is
+what is left of the view call: request parsing, serialization and Python
+work. Each process aggregates per URL name; metrics_view serves the totals
+in the Prometheus text format, so scrape every worker process.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, as Prometheus expects
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+PHASES = ['auth', 'db', 'view', 'render']
+
+current_timing = contextvars.ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.phases['db'] += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def timed_phase(phase):
+    """Charge the enclosed block to a phase of the current request, if any"""
+    timing = current_timing.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.add(phase, time.perf_counter() - started)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}  # view name -> Histogram
+        self.phase_seconds = {}  # (view name, phase) -> seconds
+        self.queries = {}  # view name -> query count
+        self.responses = {}  # (view name, status class) -> count
+
+    def record(self, view_name, status_code, total, timing):
+        with self.lock:
+            self.latency.setdefault(view_name, Histogram()).observe(total)
+            for phase, seconds in timing.phases.items():
+                key = (view_name, phase)
+                self.phase_seconds[key] = self.phase_seconds.get(key, 0.0) + seconds
+            self.queries[view_name] = self.queries.get(view_name, 0) + timing.queries
+            key = (view_name, f'{status_code // 100}xx')
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render_prometheus(self):
+        with self.lock:
+            lines = [
+                '# HELP trekking_request_duration_seconds Request latency by URL name.',
+                '# TYPE trekking_request_duration_seconds histogram',
+            ]
+            for view_name, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ['+Inf'], histogram.buckets):
+                    cumulative += count
+                    lines.append(
+                        f'trekking_request_duration_seconds_bucket{{view="{view_name}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'trekking_request_duration_seconds_sum{{view="{view_name}"}} {histogram.total:.6f}')
+                lines.append(f'trekking_request_duration_seconds_count{{view="{view_name}"}} {histogram.count}')
+
+            lines += [
+                '# HELP trekking_request_phase_seconds_total Time spent per request phase.',
+                '# TYPE trekking_request_phase_seconds_total counter',
+            ]
+            for (view_name, phase), seconds in sorted(self.phase_seconds.items()):
+                lines.append(f'trekking_request_phase_seconds_total{{view="{view_name}",phase="{phase}"}} {seconds:.6f}')
+
+            lines += [
+                '# HELP trekking_request_queries_total Database queries run by requests.',
+                '# TYPE trekking_request_queries_total counter',
+            ]
+            for view_name, count in sorted(self.queries.items()):
+                lines.append(f'trekking_request_queries_total{{view="{view_name}"}} {count}')
+
+            lines += [
+                '# HELP trekking_responses_total Responses by status class.',
+                '# TYPE trekking_responses_total counter',
+            ]
+            for (view_name, status_class), count in sorted(self.responses.items()):
+                lines.append(f'trekking_responses_total{{view="{view_name}",status="{status_class}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
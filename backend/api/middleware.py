@@ -0,0 +1,79 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+from .metrics import RequestTiming, current_timing, registry
+
+
+class RequestTimingMiddleware:
+    """Time each request by phase, add a Server-Timing header and record metrics"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            with self.wrap_connections(timing):
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        # Async ORM calls run on the request's sync_to_async thread, whose
+        # connections are not the event loop's, so wrap them from there
+        stack = await sync_to_async(self.wrap_connections)(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    def wrap_connections(self, timing):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timing.execute_wrapper))
+        return stack
+
+    def finish(self, request, response, timing):
+        finished = time.perf_counter()
+        total = finished - timing.started
+        view_started = getattr(timing, 'view_started', None)
+        if view_started is not None:
+            # Whatever the view spent outside auth, queries and rendering
+            timing.add('view', max(0.0, finished - view_started - sum(timing.phases.values())))
+
+        match = request.resolver_match
+        view_name = (match.url_name or match.view_name) if match else 'unmatched'
+        registry.record(view_name, response.status_code, total, timing)
+
+        entries = []
+        for phase, seconds in timing.phases.items():
+            entry = f'{phase};dur={seconds * 1000:.2f}'
+            if phase == 'db':
+                entry += f';desc="{timing.queries} queries"'
+            entries.append(entry)
+        entries.append(f'total;dur={total * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(entries)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = current_timing.get()
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+        return None
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_emailverificationtoken_passwordresettoken_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['-created_at', 'id'], name='package_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['price', 'id'], name='package_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['duration', 'id'], name='package_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['altitude', 'id'], name='package_altitude_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['difficulty', 'price'], name='package_difficulty_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['difficulty', 'duration'], name='package_difficulty_dur_idx'),
+        ),
+    ]
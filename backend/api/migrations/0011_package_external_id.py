@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_packageimage_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    # Registration creates the profile, so login never has to; cover older users
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('api', 'UserProfile')
+    UserProfile.objects.bulk_create(
+        UserProfile(user_id=user_id)
+        for user_id in User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_package_external_id'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        # auth.User belongs to django.contrib.auth, so index it with raw SQL
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_email_idx ON auth_user (email)',
+            reverse_sql='DROP INDEX IF EXISTS auth_user_email_idx',
+        ),
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:27
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+# The buckets as of this migration, copied from api/facets.py so later
+# changes there do not alter what this migration computes
+FACET_BUCKETS = {
+    'duration': [
+        ('1-5', None, 6),
+        ('6-10', 6, 11),
+        ('11-15', 11, 16),
+        ('16-20', 16, 21),
+        ('21+', 21, None),
+    ],
+    'price': [
+        ('under-1000', None, 1000),
+        ('1000-2000', 1000, 2000),
+        ('2000-3000', 2000, 3000),
+        ('3000-5000', 3000, 5000),
+        ('5000+', 5000, None),
+    ],
+    'altitude': [
+        ('under-3000', None, 3000),
+        ('3000-4500', 3000, 4500),
+        ('4500-5500', 4500, 5500),
+        ('5500+', 5500, None),
+    ],
+}
+
+
+def facet_keys(values):
+    keys = {'difficulty': values['difficulty']}
+    for facet, buckets in FACET_BUCKETS.items():
+        value = values[facet] if values[facet] is not None else 0
+        for key, lower, upper in buckets:
+            if (lower is None or value >= lower) and (upper is None or value < upper):
+                keys[facet] = key
+                break
+    return keys
+
+
+def count_facets(apps, schema_editor):
+    Package = apps.get_model('api', 'Package')
+    PackageFacetCount = apps.get_model('api', 'PackageFacetCount')
+    counts = Counter()
+    for values in Package.objects.values('difficulty', *FACET_BUCKETS).iterator():
+        counts.update(facet_keys(values).items())
+    PackageFacetCount.objects.bulk_create(
+        PackageFacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_token_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='facet_count_unique')],
+            },
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:33
+
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_packagefacetcount'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='package',
+            name='package_latest_idx',
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='sort_difficulty',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(difficulty='EASY', then=models.Value(1)), models.When(difficulty='MEDIUM', then=models.Value(2)), models.When(difficulty='TOUGH', then=models.Value(3)), models.When(difficulty='VERY_TOUGH', then=models.Value(4)), default=models.Value(4), output_field=models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='sort_price',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce(models.F('price'), models.Value(Decimal('0')), output_field=models.DecimalField(decimal_places=2, max_digits=8)), output_field=models.DecimalField(decimal_places=2, max_digits=8)),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['created_at', 'id'], name='package_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['sort_price', 'id'], name='package_sort_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['sort_difficulty', 'id'], name='package_sort_difficulty_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_package_keyset_sort_columns'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='packageimage',
+            options={'ordering': ['order', 'id']},
+        ),
+    ]
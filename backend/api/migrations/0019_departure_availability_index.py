@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_departures_bookings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='departure',
+            index=models.Index(fields=['package', 'start_date', 'seats_remaining'], name='departure_availability_idx'),
+        ),
+    ]
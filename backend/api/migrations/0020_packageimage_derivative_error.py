@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_departure_availability_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packageimage',
+            name='derivative_error',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -5,7 +5,18 @@ from django.utils import timezone
 from datetime import timedelta
 import uuid
 
+from .filters import difficulty_rank, price_or_zero
+
 class Package(models.Model):
+    DIFFICULTY_CHOICES = [
+        ('EASY', 'Easy'),
+        ('MEDIUM', 'Medium'),
+        ('TOUGH', 'Tough'),
+        ('VERY_TOUGH', 'Very Tough'),
+    ]
+
+    # Stable key for partner catalogues; import_packages upserts on it
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     title = models.CharField(max_length=300)
     description = models.TextField()
     duration = models.PositiveSmallIntegerField(
@@ -34,27 +45,72 @@ class Package(models.Model):
     )
     difficulty = models.CharField(
         max_length=10,
-        choices=[
-            ('EASY', 'Easy'),
-            ('MEDIUM', 'Medium'),
-            ('TOUGH', 'Tough'),
-            ('VERY_TOUGH', 'Very Tough'),
-        ],
+        choices=DIFFICULTY_CHOICES,
         default='MEDIUM',
     )
+    # Sort keys of the public list (api/filters.py) as stored columns, so
+    # plain (key, id) indexes serve every order: a missing price counts as
+    # 0 and difficulties sort by rank
+    sort_price = models.GeneratedField(
+        expression=price_or_zero(),
+        output_field=models.DecimalField(max_digits=8, decimal_places=2),
+        db_persist=True,
+    )
+    sort_difficulty = models.GeneratedField(
+        expression=difficulty_rank(),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also touched when the package's images or itineraries change (api/signals.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Each index backs one of the sort orders / filters of the public list
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='package_created_idx'),
+            models.Index(fields=['price', 'id'], name='package_price_idx'),
+            models.Index(fields=['sort_price', 'id'], name='package_sort_price_idx'),
+            models.Index(fields=['sort_difficulty', 'id'], name='package_sort_difficulty_idx'),
+            models.Index(fields=['duration', 'id'], name='package_duration_idx'),
+            models.Index(fields=['altitude', 'id'], name='package_altitude_idx'),
+            models.Index(fields=['difficulty', 'price'], name='package_difficulty_price_idx'),
+            models.Index(fields=['difficulty', 'duration'], name='package_difficulty_dur_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+class PackageFacetCount(models.Model):
+    """Number of packages per facet bucket, kept current by api/signals.py"""
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='facet_count_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
 class PackageImage(models.Model):
     package = models.ForeignKey(Package, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='package_images/')
     alt_text = models.CharField(max_length=255, blank=True)
     order = models.PositiveSmallIntegerField(default=0)
+    # Filled in by api/images.py once the responsive derivatives are rendered
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=list, blank=True)
+    placeholder = models.TextField(blank=True)
+    dominant_color = models.CharField(max_length=7, blank=True)
+    # Why the last render failed; empty once derivatives are in place
+    derivative_error = models.TextField(blank=True)
 
     class Meta:
-        ordering = ['order']
+        ordering = ['order', 'id']
 
 class Itinerary(models.Model):
     package = models.ForeignKey(Package, related_name='itineraries', on_delete=models.CASCADE)
@@ -80,6 +136,69 @@ class Itinerary(models.Model):
     def __str__(self):
         return f"Day {self.day}: {self.title}"
 
+class Departure(models.Model):
+    """A dated run of a package with a fixed number of seats"""
+    package = models.ForeignKey(Package, related_name='departures', on_delete=models.CASCADE)
+    start_date = models.DateField()
+    capacity = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
+    # Seats neither held nor booked; only changed by the conditional UPDATEs in api/bookings.py
+    seats_remaining = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['start_date', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['package', 'start_date'], name='departure_package_date_unique'),
+            # The last line of defence against overselling
+            models.CheckConstraint(
+                condition=models.Q(seats_remaining__gte=0) & models.Q(seats_remaining__lte=models.F('capacity')),
+                name='departure_seats_within_capacity',
+            ),
+        ]
+        indexes = [
+            # Availability range scans (api/availability.py): per package by
+            # date, with the seat count read from the index itself
+            models.Index(fields=['package', 'start_date', 'seats_remaining'], name='departure_availability_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.seats_remaining is None:
+            self.seats_remaining = self.capacity
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.package} on {self.start_date}"
+
+class Booking(models.Model):
+    STATUS_CHOICES = [
+        ('HELD', 'Held'),
+        ('CONFIRMED', 'Confirmed'),
+        ('CANCELLED', 'Cancelled'),
+        ('EXPIRED', 'Expired'),
+    ]
+
+    reference = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    departure = models.ForeignKey(Departure, related_name='bookings', on_delete=models.PROTECT)
+    user = models.ForeignKey(User, related_name='bookings', on_delete=models.CASCADE)
+    seats = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='HELD')
+    # A HELD booking gives its seats back after this unless confirmed
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+    travellers = models.JSONField(default=list, blank=True)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # release_expired_holds scans live holds by expiry
+            models.Index(fields=['hold_expires_at'], condition=models.Q(status='HELD'), name='booking_live_hold_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reference} ({self.status})"
+
 class UserProfile(models.Model):
     GENDER_CHOICES = [
         ('M', 'Male'),
@@ -109,6 +228,12 @@ class EmailVerificationToken(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            # purge_expired_tokens deletes by expiry
+            models.Index(fields=['expires_at'], name='emailtoken_expiry_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.expires_at:
             self.expires_at = timezone.now() + timedelta(hours=24)
@@ -124,10 +249,62 @@ class PasswordResetToken(models.Model):
     expires_at = models.DateTimeField()
     used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # request_password_reset looks for the user's unused, unexpired token
+            models.Index(
+                fields=['user', 'expires_at'], condition=models.Q(used=False), name='resettoken_user_valid_idx'
+            ),
+            # purge_expired_tokens deletes expired or used tokens
+            models.Index(fields=['expires_at'], name='resettoken_expiry_idx'),
+            models.Index(fields=['id'], condition=models.Q(used=True), name='resettoken_used_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.expires_at:
             self.expires_at = timezone.now() + timedelta(hours=1)
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"Password reset token for {self.user.email}"
\ No newline at end of file
+        return f"Password reset token for {self.user.email}"
+
+class OutboxMessage(models.Model):
+    """Transactional email queued for the send_queued_emails worker"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.TextField(help_text='Comma separated recipients')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker polls for due PENDING messages
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to} ({self.status})"
+
+class RevokedToken(models.Model):
+    """A revoked JWT (jti set) or every JWT a user was issued before revoked_before"""
+    jti = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    revoked_before = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True, help_text='When the revoked tokens expire anyway')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        if self.jti:
+            return f"Revoked token {self.jti}"
+        return f"Tokens of {self.user_id} issued before {self.revoked_before}"
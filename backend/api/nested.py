@@ -0,0 +1,84 @@
+"""Nested itinerary and image writes for the admin package views.
+
+PackageSerializer accepts a package's itinerary days, and the alt text and
+order of its existing images, in the same request as the package itself.
+Instead of rewriting every row, save_package() compares the submitted rows
+with the stored ones, itinerary days keyed by day (unique per package) and
+images by id, then inserts new rows with one bulk_create, updates changed
+ones with one bulk_update and removes missing ones with one delete, in the
+package's transaction. Omitting a list leaves those rows alone; an empty
+list removes them all. Image files themselves are still uploaded through
+admin/packages/<id>/images/.
+"""
+from django.db import transaction
+
+from .models import Itinerary, PackageImage
+from .signals import notify_bulk_change, suppress_catalogue_signals
+
+ITINERARY_FIELDS = ['title', 'description', 'icon']
+IMAGE_FIELDS = ['alt_text', 'order']
+
+
+def changed_rows(existing, submitted, fields):
+    """Existing rows with the submitted values set, for those that differ"""
+    changed = []
+    for key, row in existing.items():
+        values = submitted.get(key)
+        if values is None:
+            continue
+        updates = {field: values[field] for field in fields if field in values and getattr(row, field) != values[field]}
+        for field, value in updates.items():
+            setattr(row, field, value)
+        if updates:
+            changed.append(row)
+    return changed
+
+
+def sync_itineraries(package, days):
+    """Make the package's itinerary match days; True if anything changed"""
+    # Served from the prefetch cache when the view loaded the package with its rows
+    existing = {itinerary.day: itinerary for itinerary in package.itineraries.all()}
+    submitted = {values['day']: values for values in days}
+    removed = [itinerary.pk for day, itinerary in existing.items() if day not in submitted]
+    created = [Itinerary(package=package, **values) for day, values in submitted.items() if day not in existing]
+    updated = changed_rows(existing, submitted, ITINERARY_FIELDS)
+
+    if removed:
+        Itinerary.objects.filter(pk__in=removed).delete()
+    if created:
+        Itinerary.objects.bulk_create(created)
+    if updated:
+        Itinerary.objects.bulk_update(updated, ITINERARY_FIELDS)
+    return bool(removed or created or updated)
+
+
+def sync_images(package, images):
+    """Apply alt text and order to the package's images and remove the omitted ones; True if anything changed"""
+    existing = {image.pk: image for image in package.images.all()}
+    submitted = {values['id']: values for values in images}
+    removed = [pk for pk in existing if pk not in submitted]
+    updated = changed_rows(existing, submitted, IMAGE_FIELDS)
+
+    if removed:
+        PackageImage.objects.filter(pk__in=removed).delete()
+    if updated:
+        PackageImage.objects.bulk_update(updated, IMAGE_FIELDS)
+    return bool(removed or updated)
+
+
+def save_package(serializer):
+    """serializer.save() for a PackageSerializer, with its nested rows written as a diff"""
+    itineraries = serializer.validated_data.get('itineraries')
+    images = serializer.validated_data.get('images')
+    with transaction.atomic():
+        package = serializer.save()
+        changed = False
+        # One notify_bulk_change() below instead of a touch per row
+        with suppress_catalogue_signals():
+            if itineraries is not None:
+                changed |= sync_itineraries(package, itineraries)
+            if images is not None:
+                changed |= sync_images(package, images)
+        if changed:
+            notify_bulk_change([package.id])
+    return package
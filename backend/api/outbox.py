@@ -0,0 +1,109 @@
+"""Database-backed outbox for transactional email.
+
+Views call enqueue_email() inside the transaction that creates the token
+the message refers to, so a message exists exactly when its token does.
+The send_queued_emails command delivers due messages in batches over one
+SMTP connection, retrying failures with exponential backoff.
+
+A worker claims a batch in a short transaction by pushing the messages'
+next_attempt_at out by EMAIL_OUTBOX_LEASE, then talks to SMTP with no
+transaction or row locks held and records each result with its own UPDATE.
+If the worker dies mid-batch, its unrecorded messages fall due again once
+the lease runs out.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+def outbox_setting(name, default):
+    return getattr(settings, f'EMAIL_OUTBOX_{name}', default)
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    return OutboxMessage.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=','.join(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    base = outbox_setting('RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), outbox_setting('MAX_RETRY_DELAY', 60 * 60 * 6)))
+
+
+def claim_batch(batch_size):
+    """Lease up to batch_size due messages to this worker and count the attempt"""
+    with transaction.atomic():
+        # skip_locked lets several workers claim side by side
+        messages = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        lease_until = timezone.now() + timedelta(seconds=outbox_setting('LEASE', 600))
+        OutboxMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+            attempts=F('attempts') + 1, next_attempt_at=lease_until
+        )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def record_result(message, **fields):
+    # Matching attempts skips the write if the lease ran out and another worker took over
+    OutboxMessage.objects.filter(pk=message.pk, status='PENDING', attempts=message.attempts).update(**fields)
+
+
+def send_batch(connection, batch_size=None):
+    """Deliver one batch of due messages; returns (sent, failed) counts"""
+    batch_size = batch_size or outbox_setting('BATCH_SIZE', 50)
+    max_attempts = outbox_setting('MAX_ATTEMPTS', 5)
+    sent = failed = 0
+
+    for message in claim_batch(batch_size):
+        try:
+            EmailMessage(
+                subject=message.subject,
+                body=message.body,
+                from_email=message.from_email,
+                to=message.to.split(','),
+                connection=connection,
+            ).send()
+        except Exception as e:
+            failed += 1
+            if message.attempts >= max_attempts:
+                record_result(message, status='FAILED', last_error=str(e))
+            else:
+                record_result(
+                    message, last_error=str(e), next_attempt_at=timezone.now() + retry_delay(message.attempts)
+                )
+        else:
+            sent += 1
+            record_result(message, status='SENT', sent_at=timezone.now(), last_error='')
+    return sent, failed
+
+
+def drain_outbox(batch_size=None):
+    """Send batches until nothing is due, reusing one connection throughout"""
+    total_sent = total_failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+        while True:
+            sent, failed = send_batch(connection, batch_size)
+            total_sent += sent
+            total_failed += failed
+            if not sent and not failed:
+                return total_sent, total_failed
+    finally:
+        connection.close()
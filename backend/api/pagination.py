@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .filters import seek_packages
+
+
+class NumberedPage:
+    """One page by number out of count rows; NotFound if there is no such page.
+
+    PackagePagination and the async package_list both page through this,
+    so the two agree on page numbers, 404s and links.
+    """
+
+    def __init__(self, count, number, size):
+        self.count = count
+        self.size = size
+        self.page_count = max(1, -(-count // size))
+        if number in PackagePagination.last_page_strings:
+            number = self.page_count
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 0
+        if not 1 <= number <= self.page_count:
+            raise NotFound(PackagePagination.invalid_page_message)
+        self.number = number
+        self.offset = (number - 1) * size
+
+    def slice(self, queryset):
+        return queryset[self.offset:self.offset + self.size]
+
+    def links(self, url):
+        """(next URL, previous URL); the first page's link drops the page parameter"""
+        param = PackagePagination.page_query_param
+        next_url = previous_url = None
+        if self.number < self.page_count:
+            next_url = replace_query_param(url, param, self.number + 1)
+        if self.number == 2:
+            previous_url = remove_query_param(url, param)
+        elif self.number > 2:
+            previous_url = replace_query_param(url, param, self.number - 1)
+        return next_url, previous_url
+
+
+class PackagePagination(PageNumberPagination):
+    """Page-number pagination for the package catalogue"""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_page_message = 'Invalid page.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.url = request.build_absolute_uri()
+        self.page = NumberedPage(
+            queryset.count(), request.query_params.get(self.page_query_param, 1), page_size(request)
+        )
+        return list(self.page.slice(queryset))
+
+    def get_paginated_response(self, data):
+        next_url, previous_url = self.page.links(self.url)
+        return Response({'count': self.page.count, 'next': next_url, 'previous': previous_url, 'results': data})
+
+
+def page_size(request):
+    """PackagePagination's page size rules for any request with a query string"""
+    try:
+        size = int(request.GET[PackagePagination.page_size_query_param])
+    except (KeyError, ValueError):
+        return PackagePagination.page_size
+    if size <= 0:
+        return PackagePagination.page_size
+    return min(size, PackagePagination.max_page_size)
+
+
+def encode_cursor(sort_by, position, backwards=False):
+    value, pk = position
+    payload = {'s': sort_by, 'v': value.isoformat() if hasattr(value, 'isoformat') else str(value), 'id': pk}
+    if backwards:
+        payload['b'] = 1
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_by):
+    """(position, backwards) for a cursor of this sort; ValueError if it is not one"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if payload['s'] != sort_by:
+            raise ValueError('Cursor is for another sort order')
+        if sort_by == 'latest':
+            value = parse_datetime(payload['v'])
+            if value is None:
+                raise ValueError('Bad timestamp')
+        elif sort_by.startswith('price'):
+            value = Decimal(payload['v'])
+        else:
+            value = int(payload['v'])
+        return (value, int(payload['id'])), bool(payload.get('b'))
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, AttributeError, InvalidOperation) as e:
+        raise ValueError(str(e))
+
+
+class KeysetPage:
+    """One page of a keyset walk and the positions either side of it.
+
+    rows is what was fetched: up to size + 1 package_values() rows after
+    the cursor position in the walk's direction, the extra one only telling
+    whether more follow.
+    """
+
+    def __init__(self, rows, size, position=None, backwards=False):
+        more = len(rows) > size
+        rows = rows[:size]
+        if backwards:
+            rows.reverse()
+        self.results = rows
+        self.has_next = more if not backwards else position is not None
+        self.has_previous = more if backwards else position is not None
+        self.next_position = self.previous_position = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            self.next_position = (last['sort_value'], last['id'])
+            self.previous_position = (first['sort_value'], first['id'])
+        else:
+            # Past either end: step back towards the cursor itself
+            self.next_position = self.previous_position = position
+
+    def links(self, url, sort_by):
+        """(next URL, previous URL) carrying cursors for the positions either side"""
+        next_url = previous_url = None
+        if self.has_next and self.next_position:
+            next_url = replace_query_param(url, 'cursor', encode_cursor(sort_by, self.next_position))
+        if self.has_previous and self.previous_position:
+            previous_url = replace_query_param(url, 'cursor', encode_cursor(sort_by, self.previous_position, backwards=True))
+        return next_url, previous_url
+
+
+def keyset_queryset(queryset, sort_by, cursor, size):
+    """(queryset of up to size + 1 rows, position, backwards) for a cursor; NotFound if it is invalid"""
+    position, backwards = None, False
+    if cursor:
+        try:
+            position, backwards = decode_cursor(cursor, sort_by)
+        except ValueError:
+            raise NotFound(PackageCursorPagination.invalid_cursor_message)
+        queryset = seek_packages(queryset, sort_by, position, backwards)
+    return queryset[:size + 1], position, backwards
+
+
+class PackageCursorPagination(BasePagination):
+    """Keyset pagination over package_values() rows of a sort_packages() queryset.
+
+    Each page seeks past the (sort value, id) of the last row through the
+    matching index instead of counting an OFFSET, so deep pages cost the
+    same as the first and rows added meanwhile do not shift the walk.
+    Cursors are opaque; there is no count.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.sort_by = view.get_sort()
+        self.url = request.build_absolute_uri()
+        size = page_size(request)
+        queryset, position, backwards = keyset_queryset(
+            queryset, self.sort_by, request.query_params.get(self.cursor_query_param), size
+        )
+        self.page = KeysetPage(list(queryset), size, position, backwards)
+        return self.page.results
+
+    def get_paginated_response(self, data):
+        next_url, previous_url = self.page.links(self.url, self.sort_by)
+        return Response({'next': next_url, 'previous': previous_url, 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
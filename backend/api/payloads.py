@@ -0,0 +1,197 @@
+"""Fast package payloads for the read endpoints.
+
+PackageSerializer builds a field object graph and runs to_representation
+per field per row, which dominates CPU time on long lists with nested
+itineraries. serialize_packages() builds the same dicts straight from
+values() rows: one query for the packages and one per expanded relation,
+grouped by package id. The output is identical to PackageSerializer's, key
+order included; PayloadParityTests in api/tests.py checks that and
+`manage.py benchmark_serializers` times both paths. Writes still go through
+PackageSerializer.
+"""
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from .models import Itinerary, PackageImage
+from .serializers import PackageSerializer
+
+ALL_FIELDS = PackageSerializer.Meta.fields
+EXPANDABLE_FIELDS = PackageSerializer.EXPANDABLE_FIELDS
+SCALAR_FIELDS = [name for name in ALL_FIELDS if name not in EXPANDABLE_FIELDS]
+IMAGE_COLUMNS = ['package_id', 'id', 'image', 'alt_text', 'order', 'width', 'height', 'placeholder', 'dominant_color', 'variants']
+ITINERARY_COLUMNS = ['package_id', 'day', 'title', 'description', 'icon']
+# DRF quantizes decimals to the model field's places and renders them as strings
+CENTS = Decimal('0.01')
+# Relative paths of segments like "package_images" or "trek_1.640.webp"
+PLAIN_SEGMENT = r'[A-Za-z0-9_\-]+(?:\.[A-Za-z0-9_\-]+)*'
+PLAIN_NAME = re.compile(rf'^{PLAIN_SEGMENT}(?:/{PLAIN_SEGMENT})*$')
+URL_PROBE = 'probe.jpg'
+
+
+def selected_fields(fields=None, expand=None):
+    """Output fields, in order, for ?fields= / ?expand= as PackageSerializer picks them"""
+    if fields is None and expand is None:
+        return list(ALL_FIELDS)
+    allowed = set(fields) if fields is not None else set(SCALAR_FIELDS)
+    allowed.update(expand or [])
+    return [name for name in ALL_FIELDS if name in allowed]
+
+
+def package_values(queryset, fields=None, expand=None):
+    """values() rows of a Package queryset with just the columns the payload needs"""
+    columns = ['id'] + [name for name in selected_fields(fields, expand) if name in SCALAR_FIELDS and name != 'id']
+    if 'sort_value' in queryset.query.annotations:
+        # Keyset pagination reads it back (api/pagination.py)
+        columns.append('sort_value')
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def related_querysets(package_ids, names):
+    """{relation: values_list() queryset} for the expanded relations of these packages"""
+    # An empty package_ids runs no query: Django short-circuits __in=[]
+    querysets = {}
+    if 'images' in names:
+        # id breaks ties in order, as PackageImage.Meta.ordering does
+        querysets['images'] = PackageImage.objects.filter(package_id__in=package_ids).order_by('order', 'id').values_list(*IMAGE_COLUMNS)
+    if 'itineraries' in names:
+        querysets['itineraries'] = Itinerary.objects.filter(package_id__in=package_ids).order_by('day').values_list(*ITINERARY_COLUMNS)
+    return querysets
+
+
+def serialize_packages(rows, request=None, fields=None, expand=None):
+    """PackageSerializer(many=True) output for package_values() rows"""
+    rows = list(rows)
+    names = selected_fields(fields, expand)
+    related = {
+        name: list(queryset)
+        for name, queryset in related_querysets([row['id'] for row in rows], names).items()
+    }
+    return build_payloads(rows, related, request, names)
+
+
+async def aserialize_packages(rows, request=None, fields=None, expand=None):
+    """serialize_packages() for async views, loading the relations through the async ORM"""
+    names = selected_fields(fields, expand)
+    related = {
+        name: [row async for row in queryset]
+        for name, queryset in related_querysets([row['id'] for row in rows], names).items()
+    }
+    return build_payloads(rows, related, request, names)
+
+
+def format_decimal(value):
+    return None if value is None else '{:f}'.format(value.quantize(CENTS))
+
+
+def datetime_formatter():
+    """DRF's ISO 8601 DateTimeField output in the current time zone"""
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def format_datetime(value):
+        if value is None:
+            return None
+        if tz is not None and timezone.is_aware(value):
+            value = value.astimezone(tz)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return format_datetime
+
+
+def url_builder(storage, request):
+    """name -> the URL FieldFile.url gives, made absolute when there is a request.
+
+    FileSystemStorage.url() urljoins the quoted name onto MEDIA_URL. For names
+    of plain path segments, which quoting and joining leave untouched, that is
+    a concatenation, so the prefix is worked out once. Anything else takes the
+    regular path.
+    """
+    def build(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    if not isinstance(storage, FileSystemStorage):
+        return build
+    probe = build(URL_PROBE)
+    if not probe.endswith(URL_PROBE):
+        return build
+    prefix = probe[:-len(URL_PROBE)]
+    match = PLAIN_NAME.match
+    return lambda name: prefix + name if match(name) else build(name)
+
+
+def group_images(rows, request):
+    """{package id: PackageImageSerializer output} from IMAGE_COLUMNS rows"""
+    url = url_builder(PackageImage._meta.get_field('image').storage, request)
+    grouped = {}
+    for package_id, pk, name, alt_text, order, width, height, placeholder, dominant_color, variants in rows:
+        image_url = url(name) if name else None
+        sources = {}
+        for variant in variants:
+            sources.setdefault(variant['format'], []).append(f"{url(variant['name'])} {variant['width']}w")
+        grouped.setdefault(package_id, []).append({
+            'id': pk,
+            'image': image_url,
+            'alt_text': alt_text,
+            'order': order,
+            'width': width,
+            'height': height,
+            'placeholder': placeholder,
+            'dominant_color': dominant_color,
+            'srcset': {image_format: ', '.join(candidates) for image_format, candidates in sources.items()},
+        })
+    return grouped
+
+
+def group_itineraries(rows):
+    """{package id: ItinerarySerializer output} from ITINERARY_COLUMNS rows"""
+    grouped = {}
+    for package_id, day, title, description, icon in rows:
+        grouped.setdefault(package_id, []).append({'day': day, 'title': title, 'description': description, 'icon': icon})
+    return grouped
+
+
+def build_payloads(rows, related, request, names):
+    images = group_images(related['images'], request) if 'images' in names else {}
+    itineraries = group_itineraries(related['itineraries']) if 'itineraries' in names else {}
+    format_datetime = datetime_formatter()
+
+    if names == ALL_FIELDS:
+        # The default, full payload: one dict literal per row
+        return [
+            {
+                'id': row['id'],
+                'title': row['title'],
+                'description': row['description'],
+                'duration': row['duration'],
+                'price': format_decimal(row['price']),
+                'altitude': format_decimal(row['altitude']),
+                'difficulty': row['difficulty'],
+                'created_at': format_datetime(row['created_at']),
+                'images': images.get(row['id'], []),
+                'itineraries': itineraries.get(row['id'], []),
+            }
+            for row in rows
+        ]
+
+    formatters = {'price': format_decimal, 'altitude': format_decimal, 'created_at': format_datetime}
+    payloads = []
+    for row in rows:
+        payload = {}
+        for name in names:
+            if name == 'images':
+                payload[name] = images.get(row['id'], [])
+            elif name == 'itineraries':
+                payload[name] = itineraries.get(row['id'], [])
+            elif name in formatters:
+                payload[name] = formatters[name](row[name])
+            else:
+                payload[name] = row[name]
+        payloads.append(payload)
+    return payloads
@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import timed_phase
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that charges its time to the request's render phase"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed_phase('render'):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,145 @@
+"""Read-replica routing.
+
+ReplicaRouter sends reads to a random alias in DATABASE_REPLICAS and writes
+to 'default'. Reads go to the primary instead when:
+
+* they run inside a transaction on the primary,
+* the request is not a safe method (its reads usually feed its writes),
+* the client wrote within the last READ_YOUR_WRITES_SECONDS, so it sees its
+  own changes despite replication lag, or
+* the catalogue changed within that window, so no replica lag gets cached
+  under the new catalogue version.
+
+ReplicaRoutingMiddleware decides per request; the decision lives in a
+context variable so it follows async views into sync_to_async threads.
+With no replicas configured everything stays on 'default'.
+"""
+import contextvars
+import hashlib
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+PIN_KEY = 'db-pin:%s'
+CATALOGUE_PIN = 'catalogue'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.wrote = False
+        # One replica per request, so its queries see a single snapshot
+        self.replica = random.choice(replica_aliases()) if replica_aliases() else None
+
+
+routing_state = contextvars.ContextVar('routing_state', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def read_your_writes_seconds():
+    return getattr(settings, 'READ_YOUR_WRITES_SECONDS', 5)
+
+
+def pin_primary(name):
+    """Route reads for this client (or the whole catalogue) to the primary for a while"""
+    if replica_aliases():
+        cache.set(PIN_KEY % name, True, read_your_writes_seconds())
+
+
+@contextmanager
+def use_primary():
+    """Send every read in the block to the primary"""
+    token = routing_state.set(RoutingState(primary=True))
+    try:
+        yield
+    finally:
+        routing_state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas:
+            return None
+        state = routing_state.get()
+        if state is not None and state.primary:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        if state is not None and state.replica:
+            return state.replica
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Chooses primary or replica reads per request and records client writes"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def client_key(self, request):
+        # Stateless JWTs identify a session without a database lookup
+        credential = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+        return 'client:' + hashlib.sha1(credential.encode()).hexdigest()
+
+    def pin_keys(self, request):
+        return [PIN_KEY % self.client_key(request), PIN_KEY % CATALOGUE_PIN]
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+        primary = request.method not in SAFE_METHODS or bool(cache.get_many(self.pin_keys(request)))
+        state = RoutingState(primary)
+        token = routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        if state.wrote:
+            pin_primary(self.client_key(request))
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        primary = request.method not in SAFE_METHODS or bool(await cache.aget_many(self.pin_keys(request)))
+        state = RoutingState(primary)
+        token = routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        if state.wrote:
+            await cache.aset(PIN_KEY % self.client_key(request), True, read_your_writes_seconds())
+        return response
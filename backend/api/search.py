@@ -0,0 +1,268 @@
+"""In-process full-text search over packages and their itineraries.
+
+Each package is one document made of its title, description and itinerary
+days. Results are ranked with BM25, the last query word is matched as a
+prefix for typeahead, and each hit carries a highlighted snippet.
+
+The index is built by ``manage.py build_search_index`` and loaded lazily by
+each process. It catches up with catalogue edits on the next search by
+re-indexing packages whose ``updated_at`` moved since the last sync.
+"""
+import bisect
+import heapq
+import math
+import pickle
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+from html import escape
+
+from django.conf import settings
+from django.db.models import Max
+
+from .cache import get_catalogue_version
+from .models import Package
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Weighted term frequencies give matches in titles more pull
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'description': 1.0,
+    'itinerary_title': 2.0,
+    'itinerary_description': 1.0,
+}
+
+# Fields searched for a snippet, in order of preference
+SNIPPET_FIELDS = ['description', 'itinerary_description', 'itinerary_title', 'title']
+
+# Rows committed slightly out of updated_at order are still picked up
+SYNC_SLACK = timedelta(minutes=1)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class SearchResult:
+    package_id: int
+    title: str
+    score: float
+    snippet: str
+
+
+class SearchIndex:
+    k1 = 1.2
+    b = 0.75
+    max_prefix_expansions = 10
+
+    def __init__(self):
+        self.postings = {}        # term -> {package_id: weighted term frequency}
+        self.terms = []           # sorted vocabulary, for prefix lookups
+        self.doc_lengths = {}     # package_id -> weighted token count
+        self.documents = {}       # package_id -> [(field, text), ...]
+        self.total_length = 0.0
+        self.watermark = None     # newest Package.updated_at indexed
+        self.version = None       # catalogue version the index is synced to
+        self.norms = None         # package_id -> BM25 length normalisation, rebuilt lazily
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        state['norms'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, package):
+        """(Re-)index a package; its itineraries should be prefetched"""
+        fields = [('title', package.title), ('description', package.description)]
+        for itinerary in package.itineraries.all():
+            fields.append(('itinerary_title', itinerary.title))
+            fields.append(('itinerary_description', itinerary.description))
+
+        frequencies = Counter()
+        length = 0.0
+        for field, text in fields:
+            weight = FIELD_WEIGHTS[field]
+            tokens = tokenize(text)
+            length += weight * len(tokens)
+            for token in tokens:
+                frequencies[token] += weight
+
+        with self.lock:
+            self.remove(package.id)
+            for term, frequency in frequencies.items():
+                if term not in self.postings:
+                    self.postings[term] = {}
+                    bisect.insort(self.terms, term)
+                self.postings[term][package.id] = frequency
+            self.doc_lengths[package.id] = length
+            self.documents[package.id] = fields
+            self.total_length += length
+            self.norms = None
+            if self.watermark is None or package.updated_at > self.watermark:
+                self.watermark = package.updated_at
+
+    def remove(self, package_id):
+        with self.lock:
+            fields = self.documents.pop(package_id, None)
+            if fields is None:
+                return
+            self.total_length -= self.doc_lengths.pop(package_id)
+            self.norms = None
+            for term in {token for _, text in fields for token in tokenize(text)}:
+                postings = self.postings[term]
+                postings.pop(package_id, None)
+                if not postings:
+                    del self.postings[term]
+                    del self.terms[bisect.bisect_left(self.terms, term)]
+
+    def length_norms(self):
+        if self.norms is None:
+            average_length = self.total_length / len(self.doc_lengths) or 1.0
+            self.norms = {
+                package_id: self.k1 * (1 - self.b + self.b * length / average_length)
+                for package_id, length in self.doc_lengths.items()
+            }
+        return self.norms
+
+    def expand_prefix(self, prefix):
+        """Indexed terms starting with prefix, most common first when capped"""
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + '\uffff', lo=start)
+        matches = self.terms[start:end]
+        if len(matches) > self.max_prefix_expansions:
+            matches = heapq.nlargest(self.max_prefix_expansions, matches, key=lambda term: len(self.postings[term]))
+        return matches
+
+    def search(self, query, limit=10, prefix=True):
+        tokens = tokenize(query)
+        with self.lock:
+            if not tokens or not self.doc_lengths:
+                return []
+
+            doc_count = len(self.doc_lengths)
+            norms = self.length_norms()
+            scores = Counter()
+            matched_terms = set()
+            for position, token in enumerate(tokens):
+                if prefix and position == len(tokens) - 1:
+                    candidates = self.expand_prefix(token)
+                else:
+                    candidates = [token] if token in self.postings else []
+                for term in candidates:
+                    postings = self.postings[term]
+                    matched_terms.add(term)
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    boost = idf * (self.k1 + 1)
+                    for package_id, frequency in postings.items():
+                        scores[package_id] += boost * frequency / (frequency + norms[package_id])
+
+            if limit is None:
+                top = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            else:
+                top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [
+                SearchResult(
+                    package_id=package_id,
+                    title=self.documents[package_id][0][1],
+                    score=round(score, 4),
+                    snippet=self.snippet(package_id, matched_terms),
+                )
+                for package_id, score in top
+            ]
+
+    def snippet(self, package_id, terms, width=160):
+        """Escaped excerpt around the first match, matches wrapped in <mark>"""
+        pattern = re.compile(r'\b(' + '|'.join(sorted(map(re.escape, terms), key=len, reverse=True)) + r')\b', re.IGNORECASE)
+        fields = self.documents[package_id]
+        for wanted in SNIPPET_FIELDS:
+            for field, text in fields:
+                if field != wanted:
+                    continue
+                match = pattern.search(text)
+                if match is None:
+                    continue
+                start = max(0, match.start() - width // 3)
+                end = min(len(text), start + width)
+                excerpt = pattern.sub(lambda m: f'\0{m.group(0)}\1', text[start:end])
+                excerpt = escape(excerpt).replace('\0', '<mark>').replace('\1', '</mark>')
+                return ('…' if start else '') + excerpt + ('…' if end < len(text) else '')
+        return escape(fields[1][1][:width])
+
+
+def indexed_packages(queryset=None):
+    queryset = Package.objects.all() if queryset is None else queryset
+    return queryset.only('id', 'title', 'description', 'updated_at').prefetch_related('itineraries').iterator(chunk_size=500)
+
+
+def build_index():
+    index = SearchIndex()
+    index.version = get_catalogue_version()
+    for package in indexed_packages():
+        index.add(package)
+    return index
+
+
+def index_path():
+    return getattr(settings, 'SEARCH_INDEX_PATH', settings.BASE_DIR / 'search_index.pickle')
+
+
+def save_index(index, path=None):
+    with index.lock, open(path or index_path(), 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_index(path=None):
+    try:
+        with open(path or index_path(), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def sync_index(index):
+    """Re-index packages changed since the last sync and drop deleted ones"""
+    version = get_catalogue_version()
+    if index.version == version:
+        return
+    with index.lock:
+        changed = Package.objects.all()
+        if index.watermark is not None:
+            changed = changed.filter(updated_at__gte=index.watermark - SYNC_SLACK)
+        for package in indexed_packages(changed):
+            index.add(package)
+        live_ids = set(Package.objects.values_list('id', flat=True))
+        for package_id in set(index.doc_lengths) - live_ids:
+            index.remove(package_id)
+        index.watermark = Package.objects.aggregate(latest=Max('updated_at'))['latest']
+        index.version = version
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The process-wide index, loaded from disk or built on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_index() or build_index()
+    sync_index(_index)
+    return _index
+
+
+def search_packages(query, limit=10, prefix=True):
+    return get_index().search(query, limit=limit, prefix=prefix)
@@ -1,31 +1,261 @@
+from django.conf import settings
 from django.utils import timezone
+from datetime import timedelta
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
+from django.core.files.storage import default_storage
 from django.db import transaction
-from .models import UserProfile, EmailVerificationToken, PasswordResetToken, Package, PackageImage, Itinerary
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+from .availability import horizon_days
+from .models import UserProfile, EmailVerificationToken, PasswordResetToken, Package, PackageImage, Itinerary, Departure, Booking
+from .filters import SORT_ORDERS
+from .tokens import denylist, issue_tokens, revoke_token
 
 class PackageImageSerializer(serializers.ModelSerializer):
     image = serializers.ImageField(use_url=True)
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = PackageImage
-        fields = ['id', 'image', 'alt_text', 'order']
+        fields = ['id', 'image', 'alt_text', 'order', 'width', 'height', 'placeholder', 'dominant_color', 'srcset']
+        read_only_fields = ['width', 'height', 'placeholder', 'dominant_color']
+
+    def get_srcset(self, obj):
+        """{"webp": "<url> 320w, <url> 640w", "jpeg": ...}, empty until rendered"""
+        request = self.context.get('request')
+        sources = {}
+        for variant in obj.variants:
+            url = default_storage.url(variant['name'])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            sources.setdefault(variant['format'], []).append(f"{url} {variant['width']}w")
+        return {image_format: ', '.join(candidates) for image_format, candidates in sources.items()}
+
+class NestedImageSerializer(PackageImageSerializer):
+    """An existing image nested in a package write; only alt_text and order can change"""
+    id = serializers.IntegerField()
+    image = serializers.ImageField(use_url=True, read_only=True)
+
+    def validate(self, attrs):
+        # A PATCH makes nested fields optional too, but the id is the key
+        if 'id' not in attrs:
+            raise serializers.ValidationError({'id': "This field is required."})
+        return attrs
 
 class ItinerarySerializer(serializers.ModelSerializer):
     class Meta:
         model = Itinerary
         fields = ['day', 'title', 'description', 'icon']
 
+    def validate(self, attrs):
+        # Nested in a PATCH every field is optional, but the day is the key
+        if 'day' not in attrs:
+            raise serializers.ValidationError({'day': "This field is required."})
+        return attrs
+
+def validate_unique_days(itineraries):
+    days = [itinerary['day'] for itinerary in itineraries]
+    if len(days) != len(set(days)):
+        raise serializers.ValidationError("Itinerary days must be unique.")
+    return itineraries
+
 class PackageSerializer(serializers.ModelSerializer):
-    images = PackageImageSerializer(many=True, read_only=True)
-    itineraries = ItinerarySerializer(many=True, read_only=True)
+    # Writable for the admin views, which save them through api/nested.py
+    images = NestedImageSerializer(many=True, required=False)
+    itineraries = ItinerarySerializer(many=True, required=False)
+
+    EXPANDABLE_FIELDS = ['images', 'itineraries']
 
     class Meta:
         model = Package
         fields = ['id', 'title', 'description', 'duration', 'price', 'altitude', 'difficulty', 'created_at', 'images', 'itineraries']
 
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        # fields / expand restrict the output to a sparse fieldset; None keeps everything
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+        allowed = set(fields) if fields is not None else set(self.Meta.fields) - set(self.EXPANDABLE_FIELDS)
+        allowed.update(expand or [])
+        for name in set(self.fields) - allowed:
+            self.fields.pop(name)
+
+    def validate_itineraries(self, value):
+        return validate_unique_days(value)
+
+    def validate_images(self, value):
+        ids = [image['id'] for image in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Image ids must be unique.")
+        return value
+
+    def validate(self, attrs):
+        images = attrs.get('images')
+        if images:
+            if self.instance is None:
+                raise serializers.ValidationError({'images': "Upload images once the package exists."})
+            unknown = {image['id'] for image in images} - {image.pk for image in self.instance.images.all()}
+            if unknown:
+                raise serializers.ValidationError({'images': f"Not images of this package: {', '.join(map(str, sorted(unknown)))}."})
+        if self.partial and attrs.get('itineraries') and self.instance is not None:
+            # PATCH merges into existing days, but new ones need every field
+            existing = {itinerary.day for itinerary in self.instance.itineraries.all()}
+            incomplete = [
+                str(itinerary['day']) for itinerary in attrs['itineraries']
+                if itinerary['day'] not in existing and not {'title', 'description'} <= set(itinerary)
+            ]
+            if incomplete:
+                raise serializers.ValidationError({'itineraries': f"New days need a title and description: {', '.join(incomplete)}."})
+        return attrs
+
+    def create(self, validated_data):
+        # Nested rows are written by api/nested.py once the package is saved
+        return super().create(self._package_fields(validated_data))
+
+    def update(self, instance, validated_data):
+        return super().update(instance, self._package_fields(validated_data))
+
+    def _package_fields(self, validated_data):
+        return {name: value for name, value in validated_data.items() if name not in self.EXPANDABLE_FIELDS}
+
+class PackageFieldsSerializer(serializers.Serializer):
+    """Query parameters selecting a sparse fieldset of a package"""
+    fields = serializers.CharField(required=False)
+    expand = serializers.CharField(required=False, allow_blank=True)
+
+    def _split(self, value, choices):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        invalid = [name for name in names if name not in choices]
+        if invalid:
+            raise serializers.ValidationError(f"Unknown field: {', '.join(invalid)}.")
+        return names
+
+    def validate_fields(self, value):
+        scalar_fields = [name for name in PackageSerializer.Meta.fields if name not in PackageSerializer.EXPANDABLE_FIELDS]
+        return self._split(value, scalar_fields)
+
+    def validate_expand(self, value):
+        return self._split(value, PackageSerializer.EXPANDABLE_FIELDS)
+
+class ImageReferenceSerializer(serializers.Serializer):
+    """An image already in storage, referenced by name in an import"""
+    image = serializers.CharField(max_length=100)
+    alt_text = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+    order = serializers.IntegerField(required=False, min_value=0, default=0)
+
+class PackageImportSerializer(serializers.ModelSerializer):
+    """Validates one record of a catalogue import (see api/catalogue.py)"""
+    itineraries = ItinerarySerializer(many=True, required=False, default=list)
+    images = ImageReferenceSerializer(many=True, required=False, default=list)
+
+    class Meta:
+        model = Package
+        fields = ['external_id', 'title', 'description', 'duration', 'price', 'altitude', 'difficulty', 'itineraries', 'images']
+        # Uniqueness is handled by the upsert, not one query per record
+        extra_kwargs = {'external_id': {'validators': []}}
+
+    def validate_itineraries(self, value):
+        return validate_unique_days(value)
+
+class PackageFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the public package list"""
+    search = serializers.CharField(required=False, allow_blank=True)
+    difficulty = serializers.CharField(required=False, allow_blank=True)
+    min_duration = serializers.IntegerField(required=False, min_value=0)
+    max_duration = serializers.IntegerField(required=False, min_value=0)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+    min_altitude = serializers.DecimalField(max_digits=7, decimal_places=2, required=False, min_value=0)
+    max_altitude = serializers.DecimalField(max_digits=7, decimal_places=2, required=False, min_value=0)
+    sort = serializers.ChoiceField(choices=list(SORT_ORDERS), default='latest')
+
+    def validate_difficulty(self, value):
+        # Accepts a comma separated list, e.g. "easy,medium"
+        levels = [level.strip().upper() for level in value.split(',') if level.strip()]
+        valid_levels = dict(Package.DIFFICULTY_CHOICES)
+        invalid = [level for level in levels if level not in valid_levels]
+        if invalid:
+            raise serializers.ValidationError(f"Unknown difficulty: {', '.join(invalid)}.")
+        return levels
+
+class PackageSearchSerializer(serializers.Serializer):
+    """Query parameters accepted by the package search"""
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=50)
+    prefix = serializers.BooleanField(required=False, default=True)
+
+class DepartureSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Departure
+        fields = ['id', 'package', 'start_date', 'capacity', 'seats_remaining']
+
+class BookingSerializer(serializers.ModelSerializer):
+    departure = DepartureSerializer(read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = ['reference', 'departure', 'seats', 'status', 'hold_expires_at', 'travellers', 'notes', 'created_at']
+        read_only_fields = fields
+
+class ReservationSerializer(serializers.Serializer):
+    """Body of a seat reservation on a departure"""
+    seats = serializers.IntegerField(min_value=1)
+    travellers = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_seats(self, value):
+        max_seats = getattr(settings, 'BOOKING_MAX_SEATS', 12)
+        if value > max_seats:
+            raise serializers.ValidationError(f"At most {max_seats} seats per booking.")
+        return value
+
+    def validate(self, attrs):
+        if attrs['travellers'] and len(attrs['travellers']) != attrs['seats']:
+            raise serializers.ValidationError({'travellers': "Give one traveller per seat."})
+        return attrs
+
+class AvailabilitySerializer(serializers.Serializer):
+    """Query parameters of the departure availability endpoints"""
+    from_date = serializers.DateField(required=False)
+    to_date = serializers.DateField(required=False)
+    party_size = serializers.IntegerField(required=False, default=1, min_value=1)
+    # Bulk lookup only: comma separated package ids
+    packages = serializers.CharField(required=False)
+
+    def validate_party_size(self, value):
+        max_seats = getattr(settings, 'BOOKING_MAX_SEATS', 12)
+        if value > max_seats:
+            raise serializers.ValidationError(f"At most {max_seats} seats per booking.")
+        return value
+
+    def validate_packages(self, value):
+        try:
+            ids = [int(package_id) for package_id in value.split(',') if package_id.strip()]
+        except ValueError:
+            raise serializers.ValidationError("Package ids must be integers.")
+        if len(ids) > 100:
+            raise serializers.ValidationError("At most 100 packages per request.")
+        return ids
+
+    def validate(self, attrs):
+        # Departures leaving today are closed to bookings
+        first_day = timezone.localdate() + timedelta(days=1)
+        last_day = timezone.localdate() + timedelta(days=horizon_days())
+        attrs['from_date'] = max(attrs.get('from_date') or first_day, first_day)
+        if attrs['from_date'] > last_day:
+            raise serializers.ValidationError({'from_date': f"Availability is only known up to {last_day}."})
+        attrs.setdefault('to_date', min(attrs['from_date'] + timedelta(days=183), last_day))
+        if attrs['to_date'] < attrs['from_date']:
+            raise serializers.ValidationError({'to_date': "Must not be before from_date."})
+        if attrs['to_date'] > last_day:
+            raise serializers.ValidationError({'to_date': f"Availability is only known up to {last_day}."})
+        return attrs
+
 # User-related serializers
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
@@ -88,7 +318,7 @@ class UserLoginSerializer(serializers.Serializer):
         password = attrs.get('password')
         
         if email and password:
-            user = authenticate(username=email, password=password)
+            user = authenticate(email=email, password=password)
             
             if not user:
                 raise serializers.ValidationError("Invalid credentials.")
@@ -159,4 +389,27 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
             )
         except PasswordResetToken.DoesNotExist:
             raise serializers.ValidationError("Invalid or expired token.")
-        return value
\ No newline at end of file
+        return value
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """api/token/: the same claims as the pair login_user issues"""
+
+    def validate(self, attrs):
+        super(TokenObtainPairSerializer, self).validate(attrs)
+        return issue_tokens(self.user)
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """api/token/refresh: swap a refresh token for a new pair and revoke it"""
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if denylist.is_revoked(refresh):
+            raise InvalidToken('Token has been revoked')
+        # Reload the user so the new claims pick up staff and verified changes
+        user = User.objects.select_related('profile').filter(
+            pk=refresh[api_settings.USER_ID_CLAIM], is_active=True
+        ).first()
+        if user is None:
+            raise InvalidToken('No active account found for the given token.')
+        revoke_token(refresh)
+        return issue_tokens(user)
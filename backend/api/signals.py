@@ -0,0 +1,120 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .availability import packages_changed
+from .cache import bump_catalogue_version
+from .facets import FACET_FIELDS, apply_facet_delta, facet_keys, rebuild_facets
+from .models import Package, PackageImage, Itinerary, Departure
+from .snapshots import schedule_snapshots
+
+_state = threading.local()
+
+
+@contextmanager
+def suppress_catalogue_signals():
+    """Silence the per-row receivers below during a bulk write.
+
+    The caller is expected to call notify_bulk_change() for the packages
+    it touched instead.
+    """
+    previous = getattr(_state, 'suppressed', False)
+    _state.suppressed = True
+    try:
+        yield
+    finally:
+        _state.suppressed = previous
+
+
+@receiver(post_save, sender=Package)
+@receiver(post_delete, sender=Package)
+@receiver(post_save, sender=PackageImage)
+@receiver(post_delete, sender=PackageImage)
+@receiver(post_save, sender=Itinerary)
+@receiver(post_delete, sender=Itinerary)
+def invalidate_catalogue_cache(sender, **kwargs):
+    if getattr(_state, 'suppressed', False):
+        return
+    # Bump after commit so no reader caches the old rows under the new version
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(post_save, sender=Package)
+@receiver(post_delete, sender=Package)
+@receiver(post_save, sender=PackageImage)
+@receiver(post_delete, sender=PackageImage)
+@receiver(post_save, sender=Itinerary)
+@receiver(post_delete, sender=Itinerary)
+def refresh_snapshots(sender, instance, **kwargs):
+    if getattr(_state, 'suppressed', False):
+        return
+    schedule_snapshots([instance.pk if sender is Package else instance.package_id])
+
+
+@receiver(post_save, sender=PackageImage)
+@receiver(post_delete, sender=PackageImage)
+@receiver(post_save, sender=Itinerary)
+@receiver(post_delete, sender=Itinerary)
+def touch_package(sender, instance, **kwargs):
+    if getattr(_state, 'suppressed', False):
+        return
+    # Keeps Package.updated_at (and so ETag / Last-Modified) in step with its children
+    Package.objects.filter(pk=instance.package_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Departure)
+@receiver(post_delete, sender=Departure)
+def refresh_availability(sender, instance, **kwargs):
+    # Seat changes from bookings are plain UPDATEs; api/bookings.py bumps for those
+    packages_changed([instance.package_id])
+
+
+@receiver(pre_save, sender=Package)
+def remember_package_facets(sender, instance, update_fields=None, **kwargs):
+    instance._facet_keys = None
+    if getattr(_state, 'suppressed', False) or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(FACET_FIELDS):
+        return
+    old = Package.objects.filter(pk=instance.pk).values(*FACET_FIELDS).first()
+    if old is not None:
+        instance._facet_keys = facet_keys(old)
+
+
+@receiver(post_save, sender=Package)
+def update_package_facets(sender, instance, created, update_fields=None, **kwargs):
+    if getattr(_state, 'suppressed', False):
+        return
+    if update_fields is not None and not set(update_fields) & set(FACET_FIELDS):
+        return
+    old = getattr(instance, '_facet_keys', None)
+    if not created and old is None:
+        # Saved over a row that did not exist before, or pre_save was skipped
+        return
+    new = facet_keys({field: getattr(instance, field) for field in FACET_FIELDS})
+    old = old or {}
+    apply_facet_delta({facet: key for facet, key in old.items() if new.get(facet) != key}, -1)
+    apply_facet_delta({facet: key for facet, key in new.items() if old.get(facet) != key}, 1)
+
+
+@receiver(post_delete, sender=Package)
+def remove_package_facets(sender, instance, **kwargs):
+    if getattr(_state, 'suppressed', False):
+        return
+    apply_facet_delta(facet_keys({field: getattr(instance, field) for field in FACET_FIELDS}), -1)
+
+
+def notify_bulk_change(package_ids, facets=False):
+    """What the receivers above do, for bulk writes that skip model signals.
+
+    Pass facets=True when the packages' own fields changed.
+    """
+    Package.objects.filter(pk__in=package_ids).update(updated_at=timezone.now())
+    if facets:
+        rebuild_facets()
+    schedule_snapshots(package_ids)
+    transaction.on_commit(bump_catalogue_version)
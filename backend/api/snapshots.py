@@ -0,0 +1,277 @@
+"""Static catalogue snapshots.
+
+Writes the package list and each package's detail as JSON files under
+CATALOGUE_SNAPSHOT_DIR, rendered like the API (api/payloads.py through the
+same JSON renderer):
+
+    packages.json           every package, newest first
+    packages/<id>.json      one package
+
+Each file gets a .gz variant, and a .br variant when the brotli package is
+installed, for nginx's gzip_static / brotli_static or any static host.
+Files are written under a temporary name and renamed into place, so readers
+never see a partial file, and are left alone when their content is unchanged.
+
+build_catalogue_snapshots writes everything. With CATALOGUE_SNAPSHOTS on,
+the receivers in api/signals.py have a background thread rewrite the list
+and only the changed packages' files once the transaction commits. That
+thread waits CATALOGUE_SNAPSHOT_DELAY seconds before each pass so a burst of
+saves shares one, and re-serializes only the changed packages: the rest of
+the list is taken from the packages.json already on disk.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .filters import sort_packages
+from .models import Package
+from .renderers import TimedJSONRenderer
+from .routers import use_primary
+from .payloads import package_values, serialize_packages
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: concurrent writers are not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LIST_NAME = 'packages.json'
+DETAIL_DIR = 'packages'
+DETAIL_NAME = re.compile(r'^(\d+)\.json$')
+# The top levels are several times slower for a percent or two smaller files
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Written by one background thread, so saves never wait on serialization
+# and compression, and a burst of changes collapses into a few passes
+_lock = threading.Lock()
+_pending = set()
+_running = False
+_executor = None
+
+
+def snapshots_enabled():
+    return getattr(settings, 'CATALOGUE_SNAPSHOTS', False)
+
+
+def snapshot_delay():
+    return getattr(settings, 'CATALOGUE_SNAPSHOT_DELAY', 2)
+
+
+def snapshot_dir():
+    return getattr(settings, 'CATALOGUE_SNAPSHOT_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'catalogue')
+
+
+class SnapshotRequest:
+    """Just enough of a request for serializers to build absolute URLs"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def build_absolute_uri(self, location):
+        return urljoin(self.base_url, location)
+
+
+def serializer_context():
+    base_url = getattr(settings, 'CATALOGUE_SNAPSHOT_BASE_URL', None)
+    # Without a base URL, image URLs stay relative to the site
+    return {'request': SnapshotRequest(base_url) if base_url else None}
+
+
+def compressed_variants(content):
+    """(suffix, bytes) for each precompressed variant of a file"""
+    # mtime=0 keeps unchanged content byte for byte the same
+    yield '.gz', gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress(content, quality=BROTLI_QUALITY)
+
+
+def variant_suffixes():
+    return ['.gz', '.br'] if brotli is not None else ['.gz']
+
+
+def replace_file(path, content):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        # mkstemp creates the file private; the web server has to read it
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def write_snapshot(path, content):
+    """Write a file and its variants unless it already holds content; True if written"""
+    try:
+        with open(path, 'rb') as f:
+            unchanged = f.read() == content
+    except FileNotFoundError:
+        unchanged = False
+    if unchanged and all(os.path.exists(path + suffix) for suffix in variant_suffixes()):
+        return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Variants first, so a fresh plain file means its variants are fresh too
+    for suffix, compressed in compressed_variants(content):
+        replace_file(path + suffix, compressed)
+    replace_file(path, content)
+    return True
+
+
+def remove_snapshot(path):
+    """Delete a file and its variants; True if there was one"""
+    removed = False
+    for name in [path] + [path + suffix for suffix in ['.gz', '.br']]:
+        try:
+            os.unlink(name)
+            removed = True
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+@contextmanager
+def snapshot_lock(directory):
+    """Serialize writers, so the last one to read the database writes last"""
+    os.makedirs(directory, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_list(path):
+    """{id: payload} from a list snapshot, or None if there is no usable one"""
+    try:
+        with open(path, 'rb') as f:
+            return {package['id']: package for package in json.loads(f.read())}
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def list_payloads(path, package_ids):
+    """Every package's payload, newest first, serializing only what changed.
+
+    With package_ids None, or no readable list on disk, that is everything.
+    Otherwise it is the given packages plus any missing from the old list.
+    """
+    context = serializer_context()
+    packages = sort_packages(Package.objects.all(), 'latest')
+    previous = read_list(path) if package_ids is not None else None
+    if previous is None:
+        return serialize_packages(package_values(packages), **context)
+
+    order = list(packages.values_list('id', flat=True))
+    stale = set(package_ids) | (set(order) - set(previous))
+    fresh = serialize_packages(package_values(Package.objects.filter(pk__in=stale)), **context)
+    previous.update((package['id'], package) for package in fresh)
+    return [previous[package_id] for package_id in order if package_id in previous]
+
+
+def write_snapshots(package_ids=None, directory=None):
+    """Write the list and the given packages' files (every package's if None).
+
+    Files of packages that no longer exist are removed. Returns
+    (files written, files removed).
+    """
+    directory = directory or snapshot_dir()
+    detail_dir = os.path.join(directory, DETAIL_DIR)
+    list_path = os.path.join(directory, LIST_NAME)
+    renderer = TimedJSONRenderer()
+    written = removed = 0
+
+    with snapshot_lock(directory), use_primary():
+        data = list_payloads(list_path, package_ids)
+        written += write_snapshot(list_path, renderer.render(data))
+
+        by_id = {package['id']: package for package in data}
+        if package_ids is None:
+            package_ids = set(by_id)
+            # A full run also clears out files of packages deleted meanwhile
+            if os.path.isdir(detail_dir):
+                for name in os.listdir(detail_dir):
+                    match = DETAIL_NAME.match(name)
+                    if match and int(match.group(1)) not in by_id:
+                        removed += remove_snapshot(os.path.join(detail_dir, name))
+
+        for package_id in set(package_ids):
+            path = os.path.join(detail_dir, f'{package_id}.json')
+            if package_id in by_id:
+                written += write_snapshot(path, renderer.render(by_id[package_id]))
+            else:
+                removed += remove_snapshot(path)
+    return written, removed
+
+
+def schedule_snapshots(package_ids):
+    """Rewrite these packages' snapshots, and the list, after the transaction commits"""
+    if not snapshots_enabled():
+        return
+    package_ids = set(package_ids)
+    transaction.on_commit(lambda: queue_snapshots(package_ids))
+
+
+def queue_snapshots(package_ids):
+    global _running
+    with _lock:
+        _pending.update(package_ids)
+        if _running:
+            return
+        _running = True
+    get_executor().submit(run_snapshots)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshots')
+        return _executor
+
+
+def run_snapshots():
+    """Write queued snapshots until none are left; changes queued meanwhile share one pass"""
+    global _running
+    try:
+        while True:
+            # Let the rest of a burst of saves queue up for this pass
+            time.sleep(snapshot_delay())
+            with _lock:
+                package_ids = set(_pending)
+                _pending.clear()
+                if not package_ids:
+                    _running = False
+                    return
+            try:
+                write_snapshots(package_ids)
+            except Exception:
+                logger.exception('Failed to write catalogue snapshots for packages %s', sorted(package_ids))
+    finally:
+        connection.close()
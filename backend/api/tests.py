@@ -1,3 +1,747 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .cache import bump_catalogue_version
+from .filters import SORT_ORDERS, sort_packages
+from .bookings import (
+    BookingClosed, SeatsUnavailable, cancel_booking, change_capacity, confirm_booking, release_expired_holds,
+    reserve_seats,
+)
+from .catalogue import import_batch, iter_export_records, read_records, validate_record, write_records
+from .admin import DepartureAdminForm
+from .facets import facet_counts, rebuild_facets
+from .availability import available_departures, get_versions, upcoming_departures
+from .models import (
+    Booking, Departure, Itinerary, OutboxMessage, Package, PackageFacetCount, PackageImage, PasswordResetToken,
+)
+from .outbox import drain_outbox
+from .payloads import package_values, serialize_packages
+from .renderers import TimedJSONRenderer
+from .routers import ReplicaRouter, ReplicaRoutingMiddleware, use_primary
+from .serializers import PackageSerializer
+from .tokens import denylist, issue_tokens, revoke_token, revoke_user_tokens
+
+
+def create_package(**fields):
+    values = {
+        'title': 'Everest Base Camp',
+        'description': 'Classic teahouse trek to the foot of Everest.',
+        'duration': 14,
+        'price': Decimal('1450.00'),
+        'altitude': Decimal('5364.00'),
+        'difficulty': 'TOUGH',
+    }
+    values.update(fields)
+    return Package.objects.create(**values)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def register(self, email='walker@example.com'):
+        return self.client.post(reverse('register'), {
+            'email': email,
+            'password': 'Trek-Sherpa-2024',
+            'confirm_password': 'Trek-Sherpa-2024',
+            'full_name': 'Walker',
+            'gender': 'Other',
+            'country': 'Nepal',
+            'date_of_birth': '1990-01-01',
+            'phone': '9800000000',
+        }, format='json')
+
+    def test_registration_queues_instead_of_sending(self):
+        self.assertEqual(self.register().status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.to, 'walker@example.com')
+        self.assertEqual(message.status, 'PENDING')
+
+    def test_drain_delivers_queued_messages(self):
+        self.register()
+        self.client.post(reverse('request_password_reset'), {'email': 'walker@example.com'}, format='json')
+        self.assertEqual(drain_outbox(), (2, 0))
+        self.assertEqual([m.to for m in mail.outbox], [['walker@example.com']] * 2)
+        self.assertIn(str(PasswordResetToken.objects.get().token), mail.outbox[1].body)
+        self.assertFalse(OutboxMessage.objects.exclude(status='SENT').exists())
+        # Nothing left to send
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    def test_failed_send_backs_off(self):
+        self.register()
+        with mock.patch('api.outbox.EmailMessage.send', side_effect=OSError('connection refused')):
+            self.assertEqual(drain_outbox(), (0, 1))
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('PENDING', 1))
+        self.assertEqual(message.last_error, 'connection refused')
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        # Not due yet, so a second drain leaves it alone
+        self.assertEqual(drain_outbox(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_sends_outside_the_claim(self):
+        self.register()
+
+        def send():
+            # The lease is already written when SMTP is reached
+            message = OutboxMessage.objects.get()
+            self.assertEqual(message.attempts, 1)
+            self.assertGreater(message.next_attempt_at, timezone.now())
+            return 1
+
+        with mock.patch('api.outbox.EmailMessage.send', side_effect=send):
+            self.assertEqual(drain_outbox(), (1, 0))
+        self.assertEqual(OutboxMessage.objects.get().status, 'SENT')
+
+    def test_lease_expiry_retries_a_crashed_send(self):
+        self.register()
+        with mock.patch('api.outbox.EmailMessage.send', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                drain_outbox()
+        # Still leased to the dead worker
+        self.assertEqual(drain_outbox(), (0, 0))
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(), (1, 0))
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('SENT', 2))
+
+    def test_gives_up_after_max_attempts(self):
+        self.register()
+        OutboxMessage.objects.update(attempts=4)
+        with mock.patch('api.outbox.EmailMessage.send', side_effect=OSError('mailbox unavailable')):
+            drain_outbox()
+        self.assertEqual(OutboxMessage.objects.get().status, 'FAILED')
+
+
+class CatalogueRoundTripTests(TestCase):
+    def setUp(self):
+        keyed = create_package(external_id='partner-1')
+        keyed.itineraries.create(day=1, title='Lukla', description='Fly in and walk to Phakding.')
+        self.image = keyed.images.create(
+            image='package_images/ebc.jpg', alt_text='Khumbu', order=0, width=1280, height=853,
+            variants=[{'format': 'webp', 'width': 640, 'name': 'package_images/ebc.640.webp'}],
+        )
+        create_package(title='Annapurna Circuit', price=None, difficulty='MEDIUM')
+
+    def export(self, file_format):
+        f = io.StringIO()
+        write_records(iter_export_records(), f, file_format)
+        f.seek(0)
+        return f
+
+    def reimport(self, f, file_format):
+        return import_batch([validate_record(record) for _, record in read_records(f, file_format)])
+
+    def snapshot(self):
+        return sorted(iter_export_records(), key=lambda record: record['external_id'])
+
+    def test_round_trip_updates_in_place(self):
+        for file_format in ['jsonl', 'csv']:
+            with self.subTest(file_format=file_format):
+                before = self.snapshot()
+                self.assertEqual(self.reimport(self.export(file_format), file_format), 2)
+                self.assertEqual(Package.objects.count(), 2)
+                self.assertEqual(self.snapshot(), before)
+                # The image row, and the derivatives rendered for it, survive
+                image = PackageImage.objects.get()
+                self.assertEqual(image.pk, self.image.pk)
+                self.assertEqual((image.width, image.variants), (1280, self.image.variants))
+
+    def test_keyless_packages_get_a_stable_key(self):
+        keyless = Package.objects.get(title='Annapurna Circuit')
+        self.reimport(self.export('jsonl'), 'jsonl')
+        keyless.refresh_from_db()
+        self.assertEqual(keyless.external_id, f'pk-{keyless.pk}')
+        self.assertEqual(Package.objects.filter(title='Annapurna Circuit').count(), 1)
+
+    def test_import_replaces_nested_rows(self):
+        f = self.export('jsonl')
+        lines = [line.replace('"Lukla"', '"Namche"') for line in f]
+        self.reimport(io.StringIO(''.join(lines)), 'jsonl')
+        package = Package.objects.get(external_id='partner-1')
+        self.assertEqual([i.title for i in package.itineraries.all()], ['Namche'])
+        self.assertEqual(package.images.count(), 1)
+
+    def test_images_are_diffed_by_file_name(self):
+        record = next(r for r in iter_export_records() if r['external_id'] == 'partner-1')
+        record['images'] = [
+            {'image': 'package_images/ebc.jpg', 'alt_text': 'Khumbu valley', 'order': 1},
+            {'image': 'package_images/lukla.jpg', 'alt_text': 'Lukla', 'order': 0},
+        ]
+        with mock.patch('api.catalogue.schedule_derivatives') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                import_batch([validate_record(record)])
+        kept, added = PackageImage.objects.get(pk=self.image.pk), PackageImage.objects.get(alt_text='Lukla')
+        self.assertEqual((kept.alt_text, kept.order, kept.variants), ('Khumbu valley', 1, self.image.variants))
+        # Only the new file is rendered
+        schedule.assert_called_once_with(added)
+
+        record['images'] = record['images'][1:]
+        import_batch([validate_record(record)])
+        self.assertEqual(list(PackageImage.objects.values_list('pk', flat=True)), [added.pk])
+
+    def test_command_rebuilds_facets_and_reports_bad_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalogue.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.export('jsonl').read())
+            call_command('import_packages', path, batch_size=1, stdout=io.StringIO())
+            self.assertEqual(PackageFacetCount.objects.get(facet='difficulty', value='TOUGH').count, 1)
+
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('{not json\n')
+            with self.assertRaisesMessage(CommandError, 'Could not parse'):
+                call_command('import_packages', path, stdout=io.StringIO(), stderr=io.StringIO())
+
+
+class FacetCountTests(TestCase):
+    def counts(self):
+        # rebuild_facets() also writes the empty buckets the deltas never touch
+        return {(row.facet, row.value): row.count for row in PackageFacetCount.objects.all() if row.count}
+
+    def assertMatchesRebuild(self):
+        counts = self.counts()
+        rebuild_facets()
+        self.assertEqual(counts, self.counts())
+
+    def test_deltas_match_a_rebuild(self):
+        everest = create_package()
+        annapurna = create_package(title='Annapurna Circuit', duration=18, price=None, altitude=Decimal('5416.00'), difficulty='MEDIUM')
+        poon_hill = create_package(title='Poon Hill', duration=4, price=Decimal('650.00'), altitude=Decimal('3210.00'), difficulty='EASY')
+        self.assertMatchesRebuild()
+
+        # Across price, duration and altitude buckets, one field and several at once
+        everest.price = Decimal('2150.00')
+        everest.save()
+        self.assertMatchesRebuild()
+        annapurna.duration, annapurna.altitude, annapurna.difficulty = 9, Decimal('2900.00'), 'TOUGH'
+        annapurna.save()
+        self.assertMatchesRebuild()
+        poon_hill.price = Decimal('5200.00')
+        poon_hill.save(update_fields=['price'])
+        self.assertMatchesRebuild()
+        # Within a bucket and outside the facet fields nothing moves
+        poon_hill.title, poon_hill.price = 'Poon Hill Sunrise', Decimal('5300.00')
+        poon_hill.save()
+        self.assertMatchesRebuild()
+
+        annapurna.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(facet_counts({})['total'], 2)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        """The alias a read inside this request goes to"""
+        def get_response(request):
+            if write:
+                self.router.db_for_write(Package)
+            request.alias = self.router.db_for_read(Package)
+            return request
+        return ReplicaRoutingMiddleware(get_response)(request).alias
+
+    def test_reads_go_to_a_replica(self):
+        self.assertIn(self.router.db_for_read(Package), ['replica1', 'replica2'])
+        self.assertEqual(self.router.db_for_write(Package), 'default')
+
+    def test_one_replica_per_request(self):
+        def get_response(request):
+            request.aliases = {self.router.db_for_read(Package) for _ in range(20)}
+            return request
+        self.assertEqual(len(ReplicaRoutingMiddleware(get_response)(self.factory.get('/')).aliases), 1)
+
+    def test_use_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Package), 'default')
+
+    def test_unsafe_methods_read_the_primary(self):
+        self.assertEqual(self.route(self.factory.post('/')), 'default')
+        self.assertIn(self.route(self.factory.get('/')), ['replica1', 'replica2'])
+
+    def test_client_reads_its_own_writes(self):
+        alice = {'HTTP_AUTHORIZATION': 'Bearer alice'}
+        self.route(self.factory.post('/', **alice), write=True)
+        self.assertEqual(self.route(self.factory.get('/', **alice)), 'default')
+        # Another client is not pinned
+        self.assertIn(self.route(self.factory.get('/', HTTP_AUTHORIZATION='Bearer bob')), ['replica1', 'replica2'])
+
+    def test_catalogue_change_pins_everyone(self):
+        bump_catalogue_version()
+        self.assertEqual(self.route(self.factory.get('/')), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertIsNone(self.router.db_for_read(Package))
+        self.assertEqual(self.route(self.factory.get('/')), None)
+
+
+class ReplicaTransactionTests(TestCase):
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_reads_in_a_transaction_stay_on_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(ReplicaRouter().db_for_read(Package), 'default')
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        prices = [None, Decimal('500.00'), Decimal('1500.50')]
+        for i in range(23):
+            create_package(
+                title=f'Keyset {i}', duration=[3, 5, 7][i % 3], price=prices[i % 3],
+                difficulty=['EASY', 'MEDIUM', 'TOUGH'][i % 3],
+            )
+        # Equal sort values leave the id to break the tie
+        first = Package.objects.order_by('id').first()
+        Package.objects.filter(title__startswith='Keyset 1').update(created_at=first.created_at)
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, response):
+        return [package['id'] for package in response.json()['results']]
+
+    def walk(self, url, direction='next'):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(self.ids(response))
+            url = response.json()[direction]
+        return pages
+
+    def test_forward_and_back_match_the_full_ordering(self):
+        for sort in SORT_ORDERS:
+            with self.subTest(sort=sort):
+                full = self.ids(self.client.get(reverse('package_list'), {'sort': sort, 'page_size': 100, 'fields': 'id'}))
+                url = f"{reverse('package_list')}?sort={sort}&page_size=5&fields=id&cursor="
+                pages = self.walk(url)
+                self.assertEqual(sum(pages, []), full)
+                self.assertTrue(all(len(page) == 5 for page in pages[:-1]))
+
+                last = self.client.get(url).json()
+                while last['next']:
+                    last = self.client.get(last['next']).json()
+                back = self.walk(last['previous'], 'previous')
+                self.assertEqual(sum(reversed(back), []) + [p['id'] for p in last['results']], full)
+
+    def test_new_packages_do_not_shift_the_walk(self):
+        url = f"{reverse('package_list')}?sort=latest&page_size=5&fields=id&cursor="
+        full = self.ids(self.client.get(reverse('package_list'), {'sort': 'latest', 'page_size': 100, 'fields': 'id'}))
+        first = self.client.get(url).json()
+        # The newest package sorts first, ahead of the cursor; an OFFSET would repeat a row
+        create_package(title='Keyset newest')
+        cache.clear()
+        self.assertEqual(self.ids(self.client.get(first['next'])), full[5:10])
+
+    def test_invalid_cursors(self):
+        url = reverse('package_list')
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 404)
+        cursor = self.client.get(url, {'sort': 'latest', 'page_size': 5, 'cursor': ''}).json()['next'].split('cursor=')[1]
+        # A cursor only fits the sort it was issued for
+        self.assertEqual(self.client.get(url, {'sort': 'price-low', 'cursor': cursor}).status_code, 404)
+
+    def test_no_count_on_cursor_pages(self):
+        response = self.client.get(reverse('package_list'), {'cursor': ''}).json()
+        self.assertEqual(set(response), {'next', 'previous', 'results'})
+        self.assertIsNone(response['previous'])
+
+
+class PayloadParityTests(TestCase):
+    """api/payloads.py must render exactly what PackageSerializer does"""
+    # (fields, expand) selections besides the full payload
+    SELECTIONS = [
+        (['id', 'title', 'price'], None),
+        (None, ['images']),
+        (['title', 'created_at', 'altitude'], ['itineraries']),
+        (['id'], []),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(12):
+            package = create_package(
+                title=f'Parity {i}',
+                # Some packages have no price, which renders as null
+                price=None if i % 5 == 0 else Decimal(f'{900 + i * 37}.5'),
+                altitude=Decimal(3000 + i * 150),
+                difficulty=['EASY', 'MEDIUM', 'TOUGH', 'VERY_TOUGH'][i % 4],
+            )
+            PackageImage.objects.bulk_create(
+                PackageImage(
+                    package=package,
+                    image=f'package_images/parity_{n}.jpg',
+                    alt_text=f'View {n}',
+                    # Equal orders exercise the id tie-break
+                    order=n // 2,
+                    width=1600,
+                    height=1067,
+                    variants=[
+                        {'name': f'package_images/derivatives/parity_{n}_{width}.{image_format}', 'format': image_format, 'width': width}
+                        for image_format in ['webp', 'jpeg']
+                        for width in [320, 640]
+                    ] if n else [],
+                    placeholder='data:image/jpeg;base64,AAAA',
+                    dominant_color='#5a7d3c',
+                )
+                for n in range(i % 4)
+            )
+            Itinerary.objects.bulk_create(
+                Itinerary(package=package, day=n + 1, title=f'Day {n + 1}', description='Walk to the next village.')
+                for n in range(i % 3)
+            )
+
+    def assertSameOutput(self, fields=None, expand=None):
+        request = RequestFactory().get('/api/packages/')
+        renderer = TimedJSONRenderer()
+        queryset = sort_packages(Package.objects.all(), 'latest')
+        expected = PackageSerializer(
+            queryset.prefetch_related('images', 'itineraries'), many=True,
+            context={'request': request}, fields=fields, expand=expand,
+        ).data
+        actual = serialize_packages(package_values(queryset, fields, expand), request, fields, expand)
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_full_payload(self):
+        self.assertSameOutput()
+
+    def test_field_selections(self):
+        for fields, expand in self.SELECTIONS:
+            with self.subTest(fields=fields, expand=expand):
+                self.assertSameOutput(fields, expand)
+
+    def test_empty_page(self):
+        self.assertEqual(serialize_packages(package_values(Package.objects.none())), [])
+
+
+class NestedWriteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('nested-admin', is_staff=True))
+        self.package = create_package(duration=5)
+        for day in range(1, 4):
+            self.package.itineraries.create(day=day, title=f'Day {day}', description='Walk')
+        self.images = [
+            self.package.images.create(image=f'package_images/nested_{n}.jpg', alt_text=f'View {n}', order=n)
+            for n in range(2)
+        ]
+        self.url = reverse('package_admin_detail', args=[self.package.pk])
+
+    def days(self):
+        return {i.day: (i.pk, i.title) for i in Itinerary.objects.filter(package=self.package)}
+
+    def test_put_writes_only_the_difference(self):
+        before = self.days()
+        body = {
+            'title': 'Everest Base Camp', 'description': 'Updated', 'duration': 5, 'price': '1450.00',
+            'altitude': '5364.00', 'difficulty': 'TOUGH',
+            'itineraries': [
+                {'day': 1, 'title': 'Day 1', 'description': 'Walk'},
+                {'day': 2, 'title': 'Namche', 'description': 'Walk'},
+                {'day': 4, 'title': 'Tengboche', 'description': 'Walk'},
+            ],
+            'images': [{'id': self.images[1].pk, 'alt_text': 'Ama Dablam', 'order': 0}],
+        }
+        response = self.client.put(self.url, body, format='json')
+        self.assertEqual(response.status_code, 200)
+        after = self.days()
+        self.assertEqual(sorted(after), [1, 2, 4])
+        # Unchanged and updated days keep their rows
+        self.assertEqual(after[1], before[1])
+        self.assertEqual(after[2], (before[2][0], 'Namche'))
+        self.assertEqual(
+            [(i.pk, i.alt_text, i.order) for i in self.package.images.all()],
+            [(self.images[1].pk, 'Ama Dablam', 0)],
+        )
+        self.assertEqual([i['day'] for i in response.json()['itineraries']], [1, 2, 4])
+
+    def test_patch_merges_submitted_days(self):
+        response = self.client.patch(self.url, {'itineraries': [{'day': 2, 'title': 'Namche'}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Itinerary.objects.get(package=self.package, day=2).description, 'Walk')
+        # Days left out of the list are removed
+        self.assertEqual(sorted(self.days()), [2])
+
+    def test_omitted_lists_are_left_alone(self):
+        self.client.patch(self.url, {'title': 'Renamed'}, format='json')
+        self.assertEqual(len(self.days()), 3)
+        self.assertEqual(self.package.images.count(), 2)
+        response = self.client.patch(self.url, {'itineraries': [], 'images': []}, format='json')
+        self.assertEqual((response.json()['itineraries'], response.json()['images']), ([], []))
+
+    def test_invalid_nested_rows(self):
+        other = create_package(title='Other').images.create(image='package_images/other.jpg')
+        for body in [
+            {'itineraries': [{'day': 1, 'title': 'a'}, {'day': 1, 'title': 'b'}]},
+            {'itineraries': [{'title': 'No day'}]},
+            {'images': [{'id': other.pk}]},
+        ]:
+            with self.subTest(body=body):
+                self.assertEqual(self.client.patch(self.url, body, format='json').status_code, 400)
+        self.assertEqual(len(self.days()), 3)
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('walker', email='walker@example.com')
+        self.departure = Departure.objects.create(
+            package=create_package(), start_date=timezone.localdate() + timedelta(days=30), capacity=5
+        )
+
+    def seats_remaining(self):
+        self.departure.refresh_from_db()
+        return self.departure.seats_remaining
+
+    def lapse(self, booking):
+        Booking.objects.filter(pk=booking.pk).update(hold_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_reserve_holds_seats(self):
+        booking = reserve_seats(self.departure.pk, self.user.pk, 3)
+        self.assertEqual(booking.status, 'HELD')
+        self.assertGreater(booking.hold_expires_at, timezone.now())
+        self.assertEqual(self.seats_remaining(), 2)
+        with self.assertRaises(SeatsUnavailable):
+            reserve_seats(self.departure.pk, self.user.pk, 3)
+        self.assertEqual(self.seats_remaining(), 2)
+
+    def test_past_departures_are_closed(self):
+        Departure.objects.filter(pk=self.departure.pk).update(start_date=timezone.localdate())
+        with self.assertRaises(SeatsUnavailable):
+            reserve_seats(self.departure.pk, self.user.pk, 1)
+
+    def test_confirm_and_cancel(self):
+        booking = confirm_booking(reserve_seats(self.departure.pk, self.user.pk, 2))
+        self.assertEqual(booking.status, 'CONFIRMED')
+        self.assertIsNone(booking.hold_expires_at)
+        cancel_booking(booking)
+        self.assertEqual(self.seats_remaining(), 5)
+        # Seats come back once only
+        with self.assertRaises(BookingClosed):
+            cancel_booking(booking)
+        self.assertEqual(self.seats_remaining(), 5)
+
+    def test_expired_hold_cannot_be_confirmed(self):
+        booking = reserve_seats(self.departure.pk, self.user.pk, 2)
+        self.lapse(booking)
+        with self.assertRaises(BookingClosed):
+            confirm_booking(booking)
+
+    def test_release_expired_holds(self):
+        lapsed = reserve_seats(self.departure.pk, self.user.pk, 2)
+        live = reserve_seats(self.departure.pk, self.user.pk, 1)
+        self.lapse(lapsed)
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertEqual(release_expired_holds(), 0)
+        self.assertEqual(Booking.objects.get(pk=lapsed.pk).status, 'EXPIRED')
+        self.assertEqual(Booking.objects.get(pk=live.pk).status, 'HELD')
+        self.assertEqual(self.seats_remaining(), 4)
+
+    def test_full_departure_reclaims_lapsed_holds(self):
+        self.lapse(reserve_seats(self.departure.pk, self.user.pk, 5))
+        booking = reserve_seats(self.departure.pk, self.user.pk, 4)
+        self.assertEqual(booking.status, 'HELD')
+        self.assertEqual(self.seats_remaining(), 1)
+
+    def test_reserve_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('reserve_departure', args=[self.departure.pk])
+        response = client.post(url, {'seats': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(client.post(url, {'seats': 2}, format='json').status_code, 409)
+        self.assertEqual(client.post(reverse('reserve_departure', args=[0]), {'seats': 1}, format='json').status_code, 404)
+        reference = response.json()['reference']
+        self.assertEqual(client.post(reverse('confirm_booking', args=[reference])).status_code, 200)
+        self.assertEqual(client.post(reverse('cancel_booking', args=[reference])).status_code, 200)
+        self.assertEqual(self.seats_remaining(), 5)
+
+    def test_change_capacity_keeps_booked_seats(self):
+        reserve_seats(self.departure.pk, self.user.pk, 3)
+        self.assertTrue(change_capacity(self.departure.pk, 8))
+        self.assertEqual(self.seats_remaining(), 5)
+        self.assertFalse(change_capacity(self.departure.pk, 2))
+        self.assertTrue(change_capacity(self.departure.pk, 3))
+        self.assertEqual(self.seats_remaining(), 0)
+        self.assertEqual(self.departure.capacity, 3)
+
+    def test_admin_rejects_capacity_below_booked_seats(self):
+        reserve_seats(self.departure.pk, self.user.pk, 3)
+        data = {'package': self.departure.package_id, 'start_date': self.departure.start_date, 'capacity': 2}
+        form = DepartureAdminForm(data, instance=self.departure)
+        self.assertFalse(form.is_valid())
+        self.assertIn('capacity', form.errors)
+        for capacity in [3, 4, 9]:
+            data['capacity'] = capacity
+            self.assertTrue(DepartureAdminForm(data, instance=self.departure).is_valid(), capacity)
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('walker', email='walker@example.com')
+        self.today = timezone.localdate()
+        self.package = create_package()
+        self.other = create_package(title='Annapurna Circuit')
+        self.departures = [
+            Departure.objects.create(package=self.package, start_date=self.today + timedelta(days=days), capacity=capacity)
+            for days, capacity in [(10, 4), (40, 12), (400, 12)]
+        ]
+        Departure.objects.create(package=self.other, start_date=self.today + timedelta(days=20), capacity=8)
+
+    def seats(self, package_id):
+        return [(d['id'], d['seats_remaining']) for d in upcoming_departures([package_id])[package_id]]
+
+    def test_cached_per_package(self):
+        self.assertEqual(len(self.seats(self.package.pk)), 2, 'outside the horizon')
+        with self.assertNumQueries(0):
+            self.seats(self.package.pk)
+
+    def test_reservation_bumps_only_its_package(self):
+        self.seats(self.package.pk)
+        self.seats(self.other.pk)
+        versions = get_versions([self.package.pk, self.other.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.departures[0].pk, self.user.pk, 3)
+        after = get_versions([self.package.pk, self.other.pk])
+        self.assertNotEqual(after[self.package.pk], versions[self.package.pk])
+        self.assertEqual(after[self.other.pk], versions[self.other.pk])
+        self.assertEqual(self.seats(self.package.pk)[0], (self.departures[0].pk, 1))
+        with self.assertNumQueries(0):
+            self.seats(self.other.pk)
+
+    def test_no_bump_before_commit(self):
+        self.seats(self.package.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            reserve_seats(self.departures[0].pk, self.user.pk, 3)
+        # A reader before the commit still gets the cached entry
+        self.assertEqual(self.seats(self.package.pk)[0], (self.departures[0].pk, 4))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.seats(self.package.pk)[0], (self.departures[0].pk, 1))
+
+    def test_new_departure_bumps(self):
+        self.seats(self.package.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Departure.objects.create(package=self.package, start_date=self.today + timedelta(days=60), capacity=6)
+        self.assertEqual(len(self.seats(self.package.pk)), 3)
+
+    def test_filters_by_dates_and_party_size(self):
+        found = available_departures(
+            [self.package.pk, self.other.pk], self.today, self.today + timedelta(days=60), party_size=5
+        )
+        self.assertEqual([d['id'] for d in found[self.package.pk]], [self.departures[1].pk])
+        self.assertEqual(len(found[self.other.pk]), 1)
+
+    def test_endpoints(self):
+        response = self.client.get(reverse('package_availability', args=[self.package.pk]), {'party_size': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([d['id'] for d in response.json()['departures']], [self.departures[1].pk])
+        self.assertEqual(self.client.get(reverse('package_availability', args=[0])).status_code, 404)
+        response = self.client.get(reverse('bulk_package_availability'), {'packages': f'{self.package.pk},{self.other.pk}'})
+        self.assertEqual(set(response.json()['departures']), {str(self.package.pk), str(self.other.pk)})
+
+    def test_dates_past_the_horizon(self):
+        url = reverse('package_availability', args=[self.package.pk])
+        last_day = self.today + timedelta(days=366)
+        response = self.client.get(url, {'from_date': self.today + timedelta(days=400)})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['from_date'], [f'Availability is only known up to {last_day}.'])
+        response = self.client.get(url, {'from_date': last_day})
+        self.assertEqual(response.status_code, 200)
+        with override_settings(AVAILABILITY_HORIZON_DAYS=30):
+            response = self.client.get(url, {'to_date': self.today + timedelta(days=40)})
+            self.assertEqual(list(response.json()), ['to_date'])
+
+
+class TokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Force a re-read on the next check, whatever an earlier test left behind
+        denylist.version = None
+        self.user = User.objects.create_user('hiker', email='hiker@example.com', password='old-pass-123')
+        self.client = APIClient()
+        self.url = reverse('update_notifications')
+
+    def put_notifications(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return self.client.put(self.url, {'newsletter': True}, format='json')
+
+    def refresh(self, token):
+        self.client.credentials()
+        return self.client.post(reverse('token_refresh'), {'refresh': token}, format='json')
+
+    def test_revoked_jti(self):
+        tokens = issue_tokens(self.user)
+        other = issue_tokens(self.user)
+        self.assertEqual(self.put_notifications(tokens['access']).status_code, 200)
+        revoke_token(AccessToken(tokens['access']))
+        self.assertEqual(self.put_notifications(tokens['access']).status_code, 401)
+        # Only that token: the user's other sessions carry on
+        self.assertEqual(self.put_notifications(other['access']).status_code, 200)
+
+    def test_revoked_before_covers_earlier_tokens(self):
+        old = RefreshToken.for_user(self.user)
+        old.set_iat(at_time=timezone.now() - timedelta(minutes=1))
+        revoke_user_tokens(self.user)
+        self.assertEqual(self.put_notifications(old.access_token).status_code, 401)
+        self.assertEqual(self.refresh(str(old)).status_code, 401)
+        # Tokens issued in the revoking second or later are accepted
+        self.assertEqual(self.put_notifications(issue_tokens(self.user)['access']).status_code, 200)
+
+    def test_refresh_rotation(self):
+        first = issue_tokens(self.user)['refresh']
+        response = self.refresh(first)
+        self.assertEqual(response.status_code, 200)
+        second = response.json()['refresh']
+        self.assertNotEqual(second, first)
+        # The used refresh token is spent; its replacement works once too
+        self.assertEqual(self.refresh(first).status_code, 401)
+        self.assertEqual(self.refresh(second).status_code, 200)
+        self.assertEqual(self.refresh(second).status_code, 401)
+
+    def test_logout_with_an_expired_access_token(self):
+        tokens = issue_tokens(self.user)
+        expired = AccessToken(tokens['access'])
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {expired}')
+        response = self.client.post(reverse('logout'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    def test_logout_revokes_both_tokens(self):
+        tokens = issue_tokens(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.client.post(reverse('logout'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(self.put_notifications(tokens['access']).status_code, 401)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    def test_deleted_user(self):
+        tokens = issue_tokens(self.user)
+        self.user.delete()
+        response = self.put_notifications(tokens['access'])
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'No active account found for the given token.')
+        self.assertEqual(self.client.post(reverse('change_password'), {}, format='json').status_code, 401)
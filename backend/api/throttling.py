@@ -0,0 +1,137 @@
+"""Sliding-window throttles for the unauthenticated auth endpoints.
+
+Every (scope, client) pair costs two integer counters in Django's cache: the
+current and the previous fixed window. The sliding count is the current
+window's count plus the previous one weighted by how much of it still
+overlaps the sliding window. Throttles run in APIView.initial(), before the
+view body, so a rejected login never reaches the password hasher or the
+database. Rates live in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+"""
+import hashlib
+
+from django.core.cache import cache
+from rest_framework.throttling import SimpleRateThrottle
+
+STATS_KEY = 'throttle:stats:%(scope)s:%(outcome)s'
+
+
+def count_throttle(scope, outcome):
+    key = STATS_KEY % {'scope': scope, 'outcome': outcome}
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def throttle_counters(scopes):
+    """{scope: {'allowed': n, 'rejected': n}} since the cache was last cleared"""
+    keys = {
+        (scope, outcome): STATS_KEY % {'scope': scope, 'outcome': outcome}
+        for scope in scopes
+        for outcome in ['allowed', 'rejected']
+    }
+    values = cache.get_many(keys.values())
+    counters = {scope: {'allowed': 0, 'rejected': 0} for scope in scopes}
+    for (scope, outcome), key in keys.items():
+        counters[scope][outcome] = values.get(key, 0)
+    return counters
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        window = int(now // self.duration)
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+        counts = self.cache.get_many([current_key, previous_key])
+        self.current = counts.get(current_key, 0)
+        self.previous = counts.get(previous_key, 0)
+        self.elapsed = now - window * self.duration
+        overlap = 1 - self.elapsed / self.duration
+
+        if self.current + self.previous * overlap >= self.num_requests:
+            count_throttle(self.scope, 'rejected')
+            return False
+
+        try:
+            self.cache.incr(current_key)
+        except ValueError:
+            # Kept for two windows: one as current, one as previous
+            if not self.cache.add(current_key, 1, timeout=self.duration * 2):
+                self.cache.incr(current_key)
+        count_throttle(self.scope, 'allowed')
+        return True
+
+    def wait(self):
+        """Seconds until the weighted previous window lets one more request in"""
+        remaining = self.duration - self.elapsed
+        if self.current >= self.num_requests or not self.previous:
+            return remaining
+        # previous * (1 - t / duration) + current < num_requests
+        allowed_overlap = (self.num_requests - self.current) / self.previous
+        return max(0.0, min(remaining, (1 - allowed_overlap) * self.duration - self.elapsed))
+
+
+class IPThrottle(SlidingWindowThrottle):
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class EmailThrottle(SlidingWindowThrottle):
+    """Throttles the email address in the request body, whoever sends it"""
+    field = 'email'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get(self.field) if hasattr(request.data, 'get') else None
+        if not email or not isinstance(email, str):
+            return None
+        ident = hashlib.sha1(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(EmailThrottle):
+    scope = 'login_email'
+
+
+class LoginUsernameThrottle(LoginEmailThrottle):
+    """api/token/ logs in by username, which is the email; shares login_email's budget"""
+    field = 'username'
+
+
+class TokenRefreshIPThrottle(IPThrottle):
+    scope = 'token_refresh_ip'
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = 'register_ip'
+
+
+class RegisterEmailThrottle(EmailThrottle):
+    scope = 'register_email'
+
+
+class PasswordResetIPThrottle(IPThrottle):
+    scope = 'password_reset_ip'
+
+
+class PasswordResetEmailThrottle(EmailThrottle):
+    scope = 'password_reset_email'
+
+
+AUTH_THROTTLES = [
+    LoginIPThrottle, LoginEmailThrottle, TokenRefreshIPThrottle,
+    RegisterIPThrottle, RegisterEmailThrottle,
+    PasswordResetIPThrottle, PasswordResetEmailThrottle,
+]
@@ -0,0 +1,111 @@
+"""JWT issuing and revocation.
+
+Access tokens carry the user's id, is_staff and is_verified flags, so
+StatelessJWTAuthentication (api/authentication.py) identifies the caller
+without a query. Revocations are rows in RevokedToken, mirrored into a small
+per-process Denylist holding only entries that have not expired yet. The
+denylist re-reads the table only when the shared cache says another process
+revoked something, so checking a token costs a cache get, not a query. With
+a per-process cache (locmem) it also re-reads every JWT_DENYLIST_SYNC_INTERVAL
+seconds, which bounds how long another process can miss a revocation.
+"""
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import RevokedToken
+
+DENYLIST_VERSION_KEY = 'jwt-denylist-version'
+
+
+def issue_tokens(user, profile=None):
+    """A fresh refresh/access pair for the user, with their flags as claims"""
+    if profile is None:
+        profile = getattr(user, 'profile', None)
+    refresh = RefreshToken.for_user(user)
+    refresh['is_staff'] = user.is_staff
+    refresh['is_verified'] = bool(profile and profile.email_verified)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def token_expiry(token):
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+class Denylist:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.synced_at = 0
+        self.jtis = set()
+        self.users = {}  # user id -> revoked_before timestamp
+
+    def sync(self):
+        version = cache.get(DENYLIST_VERSION_KEY)
+        if version is None:
+            version = time.time_ns()
+            cache.add(DENYLIST_VERSION_KEY, version, timeout=None)
+            version = cache.get(DENYLIST_VERSION_KEY, version)
+        interval = getattr(settings, 'JWT_DENYLIST_SYNC_INTERVAL', 30)
+        if version == self.version and time.monotonic() - self.synced_at < interval:
+            return
+        with self.lock:
+            if version == self.version and time.monotonic() - self.synced_at < interval:
+                return
+            # Only unexpired entries are loaded, so a full re-read stays small
+            jtis, users = set(), {}
+            rows = RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list(
+                'jti', 'user_id', 'revoked_before'
+            )
+            for jti, user_id, revoked_before in rows:
+                if jti:
+                    jtis.add(jti)
+                elif user_id not in users or users[user_id] < revoked_before.timestamp():
+                    users[user_id] = revoked_before.timestamp()
+            self.jtis, self.users = jtis, users
+            self.version = version
+            self.synced_at = time.monotonic()
+
+    def is_revoked(self, token):
+        self.sync()
+        if token.get(api_settings.JTI_CLAIM) in self.jtis:
+            return True
+        revoked_before = self.users.get(token.get(api_settings.USER_ID_CLAIM))
+        # iat has one second resolution; tokens issued in the revoking second survive
+        return revoked_before is not None and token.get('iat', 0) < int(revoked_before)
+
+
+denylist = Denylist()
+
+
+def bump_denylist_version():
+    cache.set(DENYLIST_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def revoke_token(token):
+    """Revoke one access or refresh token until it expires"""
+    RevokedToken.objects.bulk_create([
+        RevokedToken(
+            jti=token[api_settings.JTI_CLAIM],
+            user_id=token[api_settings.USER_ID_CLAIM],
+            expires_at=token_expiry(token),
+        )
+    ], ignore_conflicts=True)
+    bump_denylist_version()
+
+
+def revoke_user_tokens(user):
+    """Revoke every token issued to the user so far (password changes and resets)"""
+    now = timezone.now()
+    RevokedToken.objects.create(
+        user=user,
+        revoked_before=now,
+        expires_at=now + max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME),
+    )
+    bump_denylist_version()
@@ -1,5 +1,15 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if getattr(settings, 'ASYNC_PACKAGE_VIEWS', True):
+    package_list = async_views.package_list
+    package_search = async_views.package_search
+    package_detail = async_views.package_detail
+else:
+    package_list = views.PackageListView.as_view()
+    package_search = views.package_search
+    package_detail = views.PackageDetailView.as_view()
 
 urlpatterns = [
     # Authentication URLs
@@ -16,13 +26,26 @@ urlpatterns = [
     path('auth/verify-email/<str:token>/', views.verify_email, name='verify_email'),
     path('auth/password-reset/', views.request_password_reset, name='request_password_reset'),
     path('auth/password-reset/confirm/', views.confirm_password_reset, name='confirm_password_reset'),
+    path('admin/throttles/', views.throttle_stats, name='throttle_stats'),
+    path('admin/metrics/', views.metrics_view, name='metrics'),
 
     # Package URLs - Public
-    path('packages/', views.PackageListView.as_view(), name='package_list'),
-    path('packages/<int:pk>/', views.PackageDetailView.as_view(), name='package_detail'),
+    path('packages/', package_list, name='package_list'),
+    path('packages/search/', package_search, name='package_search'),
+    path('packages/facets/', views.package_facets, name='package_facets'),
+    path('packages/availability/', views.bulk_package_availability, name='bulk_package_availability'),
+    path('packages/<int:pk>/', package_detail, name='package_detail'),
+    path('packages/<int:pk>/availability/', views.package_availability, name='package_availability'),
+
+    # Bookings
+    path('departures/<int:departure_id>/bookings/', views.reserve_departure, name='reserve_departure'),
+    path('bookings/', views.BookingListView.as_view(), name='booking_list'),
+    path('bookings/<uuid:reference>/confirm/', views.confirm_user_booking, name='confirm_booking'),
+    path('bookings/<uuid:reference>/cancel/', views.cancel_user_booking, name='cancel_booking'),
 
     # Package URLs - Admin
     path('admin/packages/', views.PackageAdminView.as_view(), name='package_admin_list'),
     path('admin/packages/<int:pk>/', views.PackageAdminDetailView.as_view(), name='package_admin_detail'),
     path('admin/packages/<int:package_id>/images/', views.PackageImageUploadView.as_view(), name='package_image_upload'),
+    path('admin/packages/<int:package_id>/images/bulk/', views.PackageImageBulkUploadView.as_view(), name='package_image_bulk_upload'),
 ]
\ No newline at end of file
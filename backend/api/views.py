@@ -1,21 +1,54 @@
-from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import status, generics, permissions, serializers
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAdminUser, IsAuthenticated  
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.conf import settings
 from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 import uuid
 
-from .models import UserProfile, EmailVerificationToken, PasswordResetToken, Package
+from .authentication import StatelessJWTAuthentication
+from .availability import available_departures
+from .bookings import BookingClosed, SeatsUnavailable, cancel_booking, confirm_booking, reserve_seats
+from .cache import cached_catalogue_response, catalogue_cache_key, catalogue_cache_timeout, catalogue_etag
+from .models import UserProfile, EmailVerificationToken, PasswordResetToken, Package, PackageImage, Departure, Booking
+from .facets import facet_counts
+from .filters import filter_packages, sort_packages
+from .images import schedule_derivatives
+from .metrics import registry
+from .nested import save_package
+from .outbox import enqueue_email
+from .pagination import PackageCursorPagination, PackagePagination
+from .payloads import package_values, serialize_packages
+from .search import search_packages
+from .signals import notify_bulk_change
+from .throttling import (
+    AUTH_THROTTLES, LoginIPThrottle, LoginEmailThrottle, LoginUsernameThrottle, TokenRefreshIPThrottle,
+    RegisterIPThrottle, RegisterEmailThrottle, PasswordResetIPThrottle, PasswordResetEmailThrottle, throttle_counters
+)
+from .tokens import issue_tokens, revoke_token, revoke_user_tokens
 from .serializers import (
-    PackageImageSerializer, PackageSerializer,
+    PackageImageSerializer, PackageSerializer, PackageFilterSerializer, PackageFieldsSerializer,
+    PackageSearchSerializer, BookingSerializer, ReservationSerializer, AvailabilitySerializer,
     UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer,
     PasswordChangeSerializer, PasswordResetRequestSerializer, 
     PasswordResetConfirmSerializer
@@ -24,28 +57,25 @@ from .serializers import (
 # User Authentication Views
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([RegisterIPThrottle, RegisterEmailThrottle])
 def register_user(request):
     """User registration endpoint"""
     serializer = UserRegistrationSerializer(data=request.data)
     
     if serializer.is_valid():
-        user = serializer.save()
-        
-        # Get the verification token
-        verification_token = EmailVerificationToken.objects.get(user=user)
-        
-        # Send verification email
-        try:
+        with transaction.atomic():
+            user = serializer.save()
+            
+            # Get the verification token
+            verification_token = EmailVerificationToken.objects.get(user=user)
+            
+            # Queue the verification email; send_queued_emails delivers it
             verification_link = f"{settings.FRONTEND_URL}/verify-email/{verification_token.token}"
-            send_mail(
+            enqueue_email(
                 subject='Verify Your Email - Trekking Website',
                 message=f'Please click the link to verify your email: {verification_link}',
-                from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[user.email],
-                fail_silently=False,
             )
-        except Exception as e:
-            print(f"Failed to send verification email: {e}")
         
         return Response({
             'message': 'Registration successful! Please check your email for verification.',
@@ -56,6 +86,7 @@ def register_user(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([LoginIPThrottle, LoginEmailThrottle])
 def login_user(request):
     """User login endpoint"""
     try:
@@ -68,19 +99,15 @@ def login_user(request):
                 'message': 'Email and password are required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Try to find user by email and authenticate using username
-        try:
-            user_obj = User.objects.get(email=email)
-            user = authenticate(username=user_obj.username, password=password)
-        except User.DoesNotExist:
-            user = None
+        # EmailBackend loads the user and profile in one indexed query
+        user = authenticate(request, email=email, password=password)
         
         if user is not None:
-            # Generate token
-            token, created = Token.objects.get_or_create(user=user)
-            
-            # Get or create user profile
-            profile, created = UserProfile.objects.get_or_create(user=user)
+            # Created at registration; older accounts were backfilled by migration 0012
+            try:
+                profile = user.profile
+            except UserProfile.DoesNotExist:
+                profile = UserProfile(user=user)
             
             # Return complete user data
             user_data = {
@@ -97,9 +124,12 @@ def login_user(request):
                 'is_verified': profile.email_verified
             }
             
+            # Stateless JWT pair; the access token carries is_staff and is_verified
+            tokens = issue_tokens(user, profile)
             return Response({
                 'message': 'Login successful',
-                'token': token.key,
+                'token': tokens['access'],
+                'refresh': tokens['refresh'],
                 'user': user_data
             }, status=status.HTTP_200_OK)
         else:
@@ -112,21 +142,64 @@ def login_user(request):
             'message': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    """api/token/: the login_user throttles, keyed on the username field"""
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
+
+
+class ThrottledTokenRefreshView(TokenRefreshView):
+    throttle_classes = [TokenRefreshIPThrottle]
+
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
 def logout_user(request):
-    """User logout endpoint"""
+    """User logout endpoint.
+
+    The refresh token is enough: the access token may already have expired,
+    so it is revoked only when one is sent and still valid.
+    """
+    user_id = None
     try:
-        request.user.auth_token.delete()
-        return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
-    except:
-        return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
+        authenticated = StatelessJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        authenticated = None
+    if authenticated is not None:
+        user, access = authenticated
+        revoke_token(access)
+        user_id = user.id
+
+    refresh = request.data.get('refresh')
+    if refresh:
+        try:
+            refresh = RefreshToken(refresh)
+        except TokenError:
+            refresh = None
+        # With a valid access token, only that user's refresh token is revoked
+        if refresh is not None and user_id in (None, refresh[jwt_settings.USER_ID_CLAIM]):
+            revoke_token(refresh)
+    return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
+
+def get_token_user(user_id):
+    """The user row behind a token; a 401 once the account has been deleted"""
+    user = User.objects.select_related('profile').filter(pk=user_id).first()
+    if user is None:
+        raise AuthenticationFailed('No active account found for the given token.', code='user_not_found')
+    return user
+
+def get_user_profile(user_id):
+    """The caller's profile with its user, in one query"""
+    try:
+        return UserProfile.objects.select_related('user').get(user_id=user_id)
+    except UserProfile.DoesNotExist:
+        return UserProfile.objects.create(user=get_token_user(user_id))
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_profile(request):
     """Get user profile"""
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    profile = get_user_profile(request.user.id)
     serializer = UserProfileSerializer(profile)
     return Response(serializer.data)
 
@@ -134,12 +207,11 @@ def user_profile(request):
 @permission_classes([permissions.IsAuthenticated])
 def update_profile(request):
     """Update user profile"""
+    # Get or create user profile
+    profile = get_user_profile(request.user.id)
     try:
-        # Get or create user profile
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        
         # Update user fields
-        user = request.user
+        user = profile.user
         data = request.data
         
         if 'full_name' in data:
@@ -180,8 +252,8 @@ def update_profile(request):
 @permission_classes([permissions.IsAuthenticated])
 def update_notifications(request):
     """Update user notification preferences"""
+    profile = get_user_profile(request.user.id)
     try:
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
         data = request.data
 
         # Update notification preferences
@@ -207,8 +279,9 @@ def update_notifications(request):
 @permission_classes([permissions.IsAuthenticated])
 def change_password(request):
     """Change user password"""
+    # request.user is built from the token; the password needs the real row
+    user = get_token_user(request.user.id)
     try:
-        user = request.user
         data = request.data
 
         current_password = data.get('current_password')
@@ -229,13 +302,14 @@ def change_password(request):
         user.set_password(new_password)
         user.save()
 
-        # Update token 
-        Token.objects.filter(user=user).delete()
-        new_token = Token.objects.create(user=user)
+        # Sign out every session, then hand this one a fresh pair
+        revoke_user_tokens(user)
+        tokens = issue_tokens(user)
 
         return Response({
             'message': 'Password changed successfully',
-            'token': new_token.key
+            'token': tokens['access'],
+            'refresh': tokens['refresh']
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -272,6 +346,7 @@ def verify_email(request, token):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([PasswordResetIPThrottle, PasswordResetEmailThrottle])
 def request_password_reset(request):
     """Request password reset"""
     serializer = PasswordResetRequestSerializer(data=request.data)
@@ -280,26 +355,28 @@ def request_password_reset(request):
         email = serializer.validated_data['email']
         user = User.objects.get(email=email)
         
-        # Create password reset token
-        token = str(uuid.uuid4())
-        PasswordResetToken.objects.create(
-            user=user,
-            token=token,
-            expires_at=timezone.now() + timedelta(hours=1)
-        )
-        
-        # Send password reset email
-        try:
+        with transaction.atomic():
+            # Resend the user's pending token while it has a while left to run
+            reset_token = PasswordResetToken.objects.filter(
+                user=user,
+                used=False,
+                expires_at__gt=timezone.now() + timedelta(minutes=15)
+            ).order_by('-expires_at').first()
+            if reset_token is None:
+                reset_token = PasswordResetToken.objects.create(
+                    user=user,
+                    token=str(uuid.uuid4()),
+                    expires_at=timezone.now() + timedelta(hours=1)
+                )
+            token = reset_token.token
+            
+            # Queue the password reset email; send_queued_emails delivers it
             reset_link = f"{settings.FRONTEND_URL}/reset-password/{token}"
-            send_mail(
+            enqueue_email(
                 subject='Password Reset - Trekking Website',
                 message=f'Click the link to reset your password: {reset_link}',
-                from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[email],
-                fail_silently=False,
             )
-        except Exception as e:
-            print(f"Failed to send password reset email: {e}")
         
         return Response({'message': 'Password reset email sent'})
     
@@ -326,35 +403,253 @@ def confirm_password_reset(request):
         reset_token.used = True
         reset_token.save()
         
-        # Delete old auth tokens
-        Token.objects.filter(user=user).delete()
+        # Revoke every JWT issued before the reset
+        revoke_user_tokens(user)
         
         return Response({'message': 'Password reset successful'})
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def throttle_stats(request):
+    """Allowed and rejected request counts per auth throttle scope"""
+    scopes = [throttle.scope for throttle in AUTH_THROTTLES]
+    return Response({
+        'rates': {scope: settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].get(scope) for scope in scopes},
+        'counters': throttle_counters(scopes),
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """Request latency histograms of this process in Prometheus text format"""
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Package views (keep your existing ones)
-class PackageListView(generics.ListAPIView):
-    """List all packages (public view)"""
+class PackageFieldsMixin:
+    """Supports ?fields= and ?expand= on package read views.
+
+    Packages are read as values() rows of only the requested columns and
+    rendered by api/payloads.py, which loads only the expanded relations.
+    Without either parameter the full package is returned.
+    """
+
+    def get_selected_fields(self):
+        if not hasattr(self, '_selected_fields'):
+            params = PackageFieldsSerializer(data=self.request.query_params)
+            params.is_valid(raise_exception=True)
+            self._selected_fields = (params.validated_data.get('fields'), params.validated_data.get('expand'))
+        return self._selected_fields
+
+    def get_package_rows(self, queryset):
+        fields, expand = self.get_selected_fields()
+        return package_values(queryset, fields, expand)
+
+    def serialize_packages(self, rows):
+        fields, expand = self.get_selected_fields()
+        return serialize_packages(rows, self.request, fields, expand)
+
+class CatalogueCacheMixin:
+    """Serves GET responses from the cache under the catalogue version.
+
+    Any change to a package, image or itinerary bumps the version (see
+    api/signals.py), so cached responses never outlive an admin edit.
+    """
+
+    cached_headers = ['Content-Type', 'ETag', 'Last-Modified']
+
+    def get(self, request, *args, **kwargs):
+        key = catalogue_cache_key(request, request.accepted_renderer.format)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached_catalogue_response(request, cached)
+
+        self.catalogue_cache_key = key
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'catalogue_cache_key', None)
+        if key and isinstance(response, Response) and response.status_code == status.HTTP_200_OK:
+            response.render()
+            headers = {name: response[name] for name in self.cached_headers if response.has_header(name)}
+            cache.set(key, (response.content, headers), catalogue_cache_timeout())
+        return response
+
+class ConditionalGetMixin:
+    """Emits strong ETag / Last-Modified headers and answers conditional GETs.
+
+    get_validators() must be cheap: a 304 is returned before the queryset
+    is evaluated or anything is serialized.
+    """
+
+    def get_validators(self):
+        """Return (last modified datetime or None, fingerprint string)"""
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        last_modified, fingerprint = self.get_validators()
+        etag = catalogue_etag(request, fingerprint, request.accepted_renderer.format)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+class PackageFilterMixin:
+    """Filters and sorts package list views by the validated query parameters"""
+
+    def get_filter_params(self):
+        if not hasattr(self, '_filter_params'):
+            params = PackageFilterSerializer(data=self.request.query_params)
+            params.is_valid(raise_exception=True)
+            self._filter_params = params.validated_data
+        return self._filter_params
+
+    def get_sort(self):
+        return self.get_filter_params()['sort']
+
+    def get_queryset(self):
+        queryset = filter_packages(super().get_queryset(), self.get_filter_params())
+        return sort_packages(queryset, self.get_sort())
+
+class PackageListView(CatalogueCacheMixin, ConditionalGetMixin, PackageFieldsMixin, PackageFilterMixin, generics.ListAPIView):
+    """List packages with filtering, sorting and pagination (public view).
+
+    Served by api/async_views.py instead while ASYNC_PACKAGE_VIEWS is on.
+    """
     queryset = Package.objects.all()
     permission_classes = [permissions.AllowAny]
     serializer_class = PackageSerializer
-
-class PackageDetailView(generics.RetrieveAPIView):
-    """Get single package details (public view)"""
+    pagination_class = PackagePagination
+
+    @property
+    def paginator(self):
+        # ?cursor= (empty for the first page) switches to keyset pagination
+        if not hasattr(self, '_paginator'):
+            if PackageCursorPagination.cursor_query_param in self.request.query_params:
+                self._paginator = PackageCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_validators(self):
+        # The count catches deletions, which never move the maximum forward
+        stats = Package.objects.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        return stats['last_modified'], f"{stats['count']}:{stats['last_modified']}"
+
+    def list(self, request, *args, **kwargs):
+        rows = self.get_package_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(self.serialize_packages(page))
+
+class PackageDetailView(CatalogueCacheMixin, ConditionalGetMixin, PackageFieldsMixin, generics.RetrieveAPIView):
+    """Get single package details (public view; see PackageListView)"""
     queryset = Package.objects.all()
     permission_classes = [permissions.AllowAny]
     serializer_class = PackageSerializer
 
-class PackageAdminView(generics.ListCreateAPIView):
+    def get_validators(self):
+        updated_at = Package.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+        return updated_at, str(updated_at)
+
+    def retrieve(self, request, *args, **kwargs):
+        row = get_object_or_404(self.get_package_rows(self.get_queryset()), pk=self.kwargs['pk'])
+        return Response(self.serialize_packages([row])[0])
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def package_search(request):
+    """Ranked full-text search over packages and their itineraries"""
+    serializer = PackageSearchSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+
+    results = search_packages(params['q'], limit=params['limit'], prefix=params['prefix'])
+    return Response({
+        'query': params['q'],
+        'results': [
+            {
+                'id': result.package_id,
+                'title': result.title,
+                'score': result.score,
+                'snippet': result.snippet,
+            }
+            for result in results
+        ]
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def package_facets(request):
+    """Package counts per difficulty, duration, price and altitude bucket under the list filters"""
+    serializer = PackageFilterSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return Response(facet_counts(serializer.validated_data))
+
+def availability_params(request):
+    serializer = AvailabilitySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+def availability_response(params, departures, **extra):
+    return {
+        **extra,
+        'from_date': params['from_date'],
+        'to_date': params['to_date'],
+        'party_size': params['party_size'],
+        'departures': departures,
+    }
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def package_availability(request, pk):
+    """Departures of a package between from_date and to_date with seats for party_size"""
+    params = availability_params(request)
+    if not Package.objects.filter(pk=pk).exists():
+        return Response({'error': 'Package not found'}, status=status.HTTP_404_NOT_FOUND)
+    departures = available_departures([pk], params['from_date'], params['to_date'], params['party_size'])[pk]
+    return Response(availability_response(params, departures, package=pk))
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def bulk_package_availability(request):
+    """package_availability() for up to 100 packages at once, keyed by package id"""
+    params = availability_params(request)
+    if not params.get('packages'):
+        return Response({'packages': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+    departures = available_departures(params['packages'], params['from_date'], params['to_date'], params['party_size'])
+    return Response(availability_response(params, departures))
+
+class PackageNestedWriteMixin:
+    """Saves nested itineraries and images as a diff against the stored rows (api/nested.py)"""
+
+    def perform_create(self, serializer):
+        save_package(serializer)
+
+    def perform_update(self, serializer):
+        save_package(serializer)
+
+class PackageAdminView(PackageNestedWriteMixin, PackageFilterMixin, generics.ListCreateAPIView):
     """Admin view for listing and creating packages"""
     queryset = Package.objects.all()
     serializer_class = PackageSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = PackageCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(package_values(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(serialize_packages(page, request))
 
-class PackageAdminDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PackageAdminDetailView(PackageNestedWriteMixin, generics.RetrieveUpdateDestroyAPIView):
     """Admin view for updating and deleting packages"""
-    queryset = Package.objects.all()
+    queryset = Package.objects.prefetch_related('images', 'itineraries')
     serializer_class = PackageSerializer
     permission_classes = [IsAdminUser]
 
@@ -368,8 +663,142 @@ class PackageImageUploadView(APIView):
         except Package.DoesNotExist:
             return Response({'error': 'Package not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = PackageImageSerializer(data=request.data)
+        serializer = PackageImageSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(package=package)
+            image = serializer.save(package=package)
+            # Derivatives are rendered off the request thread and filled in later
+            transaction.on_commit(lambda: schedule_derivatives(image))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class PackageImageBulkUploadView(APIView):
+    """Upload many images for a package in one multipart request.
+
+    Files are sent as repeated "images" parts, with optional "alt_text"
+    parts in the same order. Each file is streamed to a temporary file,
+    validated and moved into storage on a thread pool. All rows are then
+    inserted at once, with order values following the existing images.
+    """
+    permission_classes = [IsAdminUser]
+
+    def store_image(self, package, upload):
+        try:
+            validated = serializers.ImageField().run_validation(upload)
+        except DjangoValidationError as e:
+            # The Pillow check inside ImageField raises Django's own error type
+            raise serializers.ValidationError(e.messages)
+        image = PackageImage(package=package)
+        image.image.save(validated.name, validated, save=False)
+        return image
+
+    def post(self, request, package_id):
+        # Must be set before the body is parsed: never buffer files in memory
+        request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+
+        try:
+            package = Package.objects.get(id=package_id)
+        except Package.DoesNotExist:
+            return Response({'error': 'Package not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        uploads = request.FILES.getlist('images')
+        alt_texts = request.data.getlist('alt_text')
+        max_files = getattr(settings, 'BULK_IMAGE_UPLOAD_MAX_FILES', 50)
+        if not uploads:
+            return Response({'error': 'No images provided'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(uploads) > max_files:
+            return Response({'error': f'At most {max_files} images per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with ThreadPoolExecutor(max_workers=min(8, len(uploads))) as executor:
+            futures = [executor.submit(self.store_image, package, upload) for upload in uploads]
+
+        results = []
+        images = []
+        for index, (upload, future) in enumerate(zip(uploads, futures)):
+            try:
+                image = future.result()
+            except serializers.ValidationError as e:
+                results.append({'file': upload.name, 'status': 'failed', 'errors': e.detail})
+                continue
+            except Exception as e:
+                results.append({'file': upload.name, 'status': 'failed', 'errors': [str(e)]})
+                continue
+            image.alt_text = alt_texts[index] if index < len(alt_texts) else ''
+            images.append(image)
+            results.append({'file': upload.name, 'status': 'created', 'image': image})
+
+        if images:
+            next_order = package.images.aggregate(last=Max('order'))['last']
+            next_order = 0 if next_order is None else next_order + 1
+            for offset, image in enumerate(images):
+                image.order = next_order + offset
+            try:
+                with transaction.atomic():
+                    PackageImage.objects.bulk_create(images)
+                    notify_bulk_change([package.id])
+            except Exception:
+                for image in images:
+                    image.image.storage.delete(image.image.name)
+                raise
+            for image in images:
+                transaction.on_commit(lambda image=image: schedule_derivatives(image))
+
+        for result in results:
+            if 'image' in result:
+                result['image'] = PackageImageSerializer(result['image'], context={'request': request}).data
+
+        if not images:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(images) < len(uploads):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({'results': results}, status=response_status)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def reserve_departure(request, departure_id):
+    """Hold seats on a departure; the booking must be confirmed before hold_expires_at"""
+    serializer = ReservationSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        booking = reserve_seats(departure_id, request.user.id, **serializer.validated_data)
+    except SeatsUnavailable:
+        if not Departure.objects.filter(pk=departure_id).exists():
+            return Response({'error': 'Departure not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'Not enough seats left on this departure'}, status=status.HTTP_409_CONFLICT)
+    booking = Booking.objects.select_related('departure').get(pk=booking.pk)
+    return Response(BookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+
+class BookingListView(generics.ListAPIView):
+    """The caller's bookings, newest first"""
+    serializer_class = BookingSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Booking.objects.filter(user_id=self.request.user.id).select_related('departure')
+
+def get_user_booking(request, reference):
+    return get_object_or_404(Booking.objects.select_related('departure'), reference=reference, user_id=request.user.id)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def confirm_user_booking(request, reference):
+    """Confirm a held booking before its hold expires"""
+    booking = get_user_booking(request, reference)
+    try:
+        confirm_booking(booking)
+    except BookingClosed as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    return Response(BookingSerializer(booking).data)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def cancel_user_booking(request, reference):
+    """Cancel a held or confirmed booking, giving its seats back"""
+    booking = get_user_booking(request, reference)
+    try:
+        cancel_booking(booking)
+    except BookingClosed as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    booking.departure.refresh_from_db(fields=['seats_remaining'])
+    return Response(BookingSerializer(booking).data)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 
@@ -39,12 +40,15 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'rest_framework.authtoken',  
+    'rest_framework_simplejwt',
     'corsheaders',
     'api',
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'api.middleware.RequestTimingMiddleware',
+    'api.routers.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -86,9 +90,26 @@ DATABASES = {
         'PASSWORD': '123456',
         'HOST': 'localhost',
         'PORT': '5432',
+        # psycopg 3 connection pool (needs psycopg-pool); replaces CONN_MAX_AGE
+        'OPTIONS': {
+            'pool': {
+                'min_size': 2,
+                'max_size': 10,
+                'timeout': 10,
+            },
+        },
     }
 }
 
+# Read replicas: add an alias per replica to DATABASES (same settings as
+# 'default' with the replica's HOST, plus 'TEST': {'MIRROR': 'default'}) and
+# list the aliases here. api/routers.py sends reads to them.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Seconds a client's reads stay on the primary after it writes
+READ_YOUR_WRITES_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -109,6 +130,12 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+AUTHENTICATION_BACKENDS = [
+    'api.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -131,9 +158,61 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# Catalogue responses are cached under a version key that is bumped on every
+# package change. locmem is per process, so deployments running several
+# worker processes should switch to a shared backend such as
+# 'django.core.cache.backends.filebased.FileBasedCache'.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'trekking-cache',
+    }
+}
+
+CATALOGUE_CACHE_TIMEOUT = 60 * 15
+
+# Package search index written by `manage.py build_search_index`
+SEARCH_INDEX_PATH = BASE_DIR / 'search_index.pickle'
+
+# Email
+# Transactional email goes through the api.OutboxMessage table and is
+# delivered by `manage.py send_queued_emails`.
+
+FRONTEND_URL = 'http://localhost:5173'
+
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60  # seconds, doubled on every failed attempt
+EMAIL_OUTBOX_LEASE = 600  # seconds a claimed batch is hidden from other workers
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Static catalogue JSON with .gz/.br variants (api/snapshots.py), written by
+# `manage.py build_catalogue_snapshots` and rewritten on every package change
+CATALOGUE_SNAPSHOTS = True
+CATALOGUE_SNAPSHOT_DIR = os.path.join(MEDIA_ROOT, 'catalogue')
+CATALOGUE_SNAPSHOT_BASE_URL = 'http://localhost:8000'  # for absolute image URLs
+CATALOGUE_SNAPSHOT_DELAY = 2  # seconds to gather changes before each rewrite
+
+# Bookings (api/bookings.py): unconfirmed seat holds lapse after this long
+# and are released by `manage.py release_expired_holds` or the next
+# reservation that finds the departure full
+BOOKING_HOLD_MINUTES = 15
+BOOKING_MAX_SEATS = 12
+
+# Departure availability (api/availability.py): how far ahead it is answered
+# and how long each package's departures stay cached between seat changes
+AVAILABILITY_HORIZON_DAYS = 366
+AVAILABILITY_CACHE_TIMEOUT = 60 * 5
+
+# Responsive derivatives rendered for every PackageImage upload (api/images.py)
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1024, 1600]
+IMAGE_DERIVATIVE_WORKERS = None  # defaults to half the CPU cores
+BULK_IMAGE_UPLOAD_MAX_FILES = 50
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
@@ -141,9 +220,58 @@ CORS_ALLOWED_ORIGINS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-}
\ No newline at end of file
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Sliding windows for the unauthenticated auth endpoints (api/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_email': '10/min',
+        'token_refresh_ip': '60/min',
+        'register_ip': '10/hour',
+        'register_email': '5/hour',
+        'password_reset_ip': '10/hour',
+        'password_reset_email': '5/hour',
+    },
+    # Throttle on REMOTE_ADDR; set to the number of reverse proxies in front
+    # of Django so X-Forwarded-For cannot be spoofed to dodge the limits
+    'NUM_PROXIES': 0,
+}
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'ROTATE_REFRESH_TOKENS': True,
+    'UPDATE_LAST_LOGIN': False,
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_USER_CLASS': 'api.authentication.ApiTokenUser',
+    'TOKEN_OBTAIN_SERIALIZER': 'api.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializers.RotatingTokenRefreshSerializer',
+}
+
+# Serve the public package list, detail and search as native async views
+# (api/async_views.py); turn off to route them to the DRF views instead
+ASYNC_PACKAGE_VIEWS = True
+
+# Seconds a process may go without re-reading revoked JWTs from the database
+# (sooner whenever the shared cache announces a revocation)
+JWT_DENYLIST_SYNC_INTERVAL = 30
+
+# Background work (image derivatives, catalogue snapshots) logs its failures
+# under the "api" logger
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
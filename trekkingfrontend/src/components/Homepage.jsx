@@ -93,10 +93,13 @@ const Homepage = () => {
     const fetchPackages = async () => {
       try {
         setIsLoading(true);
-        const response = await fetch("http://localhost:8000/api/packages/");
+        const response = await fetch(
+          // Limit to 3 packages, with only the fields the cards show
+          "http://localhost:8000/api/packages/?page_size=3&fields=id,title,price,duration,difficulty&expand=images"
+        );
         if (!response.ok) throw new Error("Failed to fetch packages");
         const data = await response.json();
-        setPackages(data.slice(0, 3)); // Limit to 3 packages
+        setPackages(data.results);
       } catch (err) {
         console.error("Error fetching packages:", err);
         setError(err.message);
@@ -1,50 +1,65 @@
-import axios from "axios";
 import { useState } from "react";
+import { useAuth } from "../contexts/AuthContext";
 
 const PackageImageUpload = ({ packageId }) => {
-  const [file, setFile] = useState(null);
+  const [files, setFiles] = useState([]);
   const [altText, setAltText] = useState("");
-  const [order, setOrder] = useState(0);
   const [error, setError] = useState("");
   const [success, setSuccess] = useState("");
+  const { authFetch } = useAuth();
 
   const handleSubmit = async (e) => {
     e.preventDefault();
-    if (!file) {
-      setError("Please select an image.");
+    if (files.length === 0) {
+      setError("Please select at least one image.");
       return;
     }
 
+    // All files go up in one request; the server assigns the order
     const formData = new FormData();
-    formData.append("image", file);
-    formData.append("alt_text", altText);
-    formData.append("order", order);
+    files.forEach((file) => {
+      formData.append("images", file);
+      formData.append("alt_text", altText);
+    });
 
     try {
-      const response = await axios.post(
-        `http://localhost:8000/api/packages/${packageId}/images/`,
-        formData,
+      // The browser sets the multipart Content-Type with its boundary
+      const response = await authFetch(
+        `http://localhost:8000/api/admin/packages/${packageId}/images/bulk/`,
         {
-          headers: {
-            "Content-Type": "multipart/form-data",
-            Authorization: `Token ${localStorage.getItem("token")}`, // Adjust based on your auth
-          },
+          method: "POST",
+          body: formData,
         }
       );
-      setSuccess("Image uploaded successfully!");
-      setFile(null);
-      setAltText("");
-      setOrder(0);
-      setError("");
+      if (response.status >= 500) {
+        throw new Error(`Upload failed with status ${response.status}`);
+      }
+      const data = await response.json();
+      const results = data.results || [];
+      const failed = results.filter((result) => result.status === "failed");
+      const created = results.length - failed.length;
+
+      if (created > 0) {
+        setSuccess(`${created} image(s) uploaded successfully!`);
+        setFiles([]);
+        setAltText("");
+      } else {
+        setSuccess("");
+      }
+      setError(
+        failed.length > 0
+          ? `Failed: ${failed.map((result) => result.file).join(", ")}`
+          : data.error || ""
+      );
     } catch (err) {
-      setError("Failed to upload image. Please try again.");
+      setError("Failed to upload images. Please try again.");
       console.error(err);
     }
   };
 
   return (
     <div className="container mx-auto p-4 bg-[#F6FFFF] text-black font-inter">
-      <h2 className="text-[32px] font-bold mb-4">Upload Image for Package</h2>
+      <h2 className="text-[32px] font-bold mb-4">Upload Images for Package</h2>
       {error && (
         <p className="text-[24px] font-medium text-red-500 mb-4">{error}</p>
       )}
@@ -55,7 +70,8 @@ const PackageImageUpload = ({ packageId }) => {
         <input
           type="file"
           accept="image/*"
-          onChange={(e) => setFile(e.target.files[0])}
+          multiple
+          onChange={(e) => setFiles(Array.from(e.target.files))}
           className="p-3 text-[24px] font-medium border rounded-lg"
         />
         <input
@@ -65,13 +81,6 @@ const PackageImageUpload = ({ packageId }) => {
           onChange={(e) => setAltText(e.target.value)}
           className="p-3 text-[24px] font-medium border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500"
         />
-        <input
-          type="number"
-          placeholder="Order"
-          value={order}
-          onChange={(e) => setOrder(e.target.value)}
-          className="p-3 text-[24px] font-medium border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500"
-        />
         <button
           type="submit"
           className="p-3 bg-blue-500 text-white text-[32px] font-bold rounded-lg hover:bg-blue-600"
@@ -20,6 +20,7 @@ import "slick-carousel/slick/slick.css";
 
 const PackageList = () => {
   const [packages, setPackages] = useState([]);
+  const [totalCount, setTotalCount] = useState(0);
   const [search, setSearch] = useState("");
   const [sortBy, setSortBy] = useState("latest");
   const [error, setError] = useState("");
@@ -31,115 +32,91 @@ const PackageList = () => {
   const [priceRange, setPriceRange] = useState(10000);
 
   const [currentPage, setCurrentPage] = useState(1);
+  const [facets, setFacets] = useState(null);
   const packagesPerPage = 10;
 
+  // Reset to page 1 when filters change
   useEffect(() => {
+    setCurrentPage(1);
+  }, [search, sortBy, region, difficulty, duration, priceRange]);
+
+  // Filtering, sorting and pagination happen on the server
+  useEffect(() => {
+    let ignore = false;
+
     const fetchPackages = async () => {
       try {
         setIsLoading(true);
-        const response = await fetch("http://localhost:8000/api/packages/");
+        const params = new URLSearchParams({
+          sort: sortBy,
+          page: currentPage,
+          page_size: packagesPerPage,
+          fields: "id,title,description,duration,price,altitude,difficulty",
+          expand: "images",
+        });
+        if (search) params.set("search", search);
+        if (difficulty !== "All Levels") params.set("difficulty", difficulty);
+        if (duration < 100) params.set("max_duration", duration);
+        if (priceRange < 10000) params.set("max_price", priceRange);
+
+        const response = await fetch(
+          `http://localhost:8000/api/packages/?${params}`
+        );
         if (!response.ok) throw new Error("Failed to fetch packages");
         const data = await response.json();
-        console.log("Fetched data:", data);
-        setPackages(data);
+        if (ignore) return;
+        setPackages(data.results);
+        setTotalCount(data.count);
+        setError("");
       } catch (err) {
+        if (ignore) return;
         console.error("Error fetching packages:", err);
         setError(err.message);
       } finally {
-        setIsLoading(false);
+        if (!ignore) setIsLoading(false);
       }
     };
 
     fetchPackages();
-  }, []);
+    return () => {
+      ignore = true;
+    };
+  }, [search, sortBy, difficulty, duration, priceRange, currentPage]);
 
-  // Reset to page 1 when filters change
+  // Counts beside each difficulty, under the other active filters
   useEffect(() => {
-    setCurrentPage(1);
-  }, [search, sortBy, region, difficulty, duration, priceRange]);
-
-  const sortPackages = (packagesToSort) => {
-    if (!Array.isArray(packagesToSort) || packagesToSort.length === 0) {
-      return [];
-    }
-    const sortedPackages = [...packagesToSort];
-    switch (sortBy) {
-      case "latest":
-        return sortedPackages.sort(
-          (a, b) =>
-            new Date(b.created_at || "1970-01-01") -
-            new Date(a.created_at || "1970-01-01")
-        );
-      case "price-high":
-        return sortedPackages.sort((a, b) => {
-          const priceA = a.price ? parseFloat(a.price) : 0;
-          const priceB = b.price ? parseFloat(b.price) : 0;
-          return priceB - priceA;
-        });
-      case "price-low":
-        return sortedPackages.sort((a, b) => {
-          const priceA = a.price ? parseFloat(a.price) : 0;
-          const priceB = b.price ? parseFloat(b.price) : 0;
-          return priceA - priceB;
-        });
-      case "duration-short":
-        return sortedPackages.sort((a, b) => {
-          const durationA = Number(a.duration) || 0;
-          const durationB = Number(b.duration) || 0;
-          return durationA - durationB;
-        });
-      case "duration-long":
-        return sortedPackages.sort((a, b) => {
-          const durationA = Number(a.duration) || 0;
-          const durationB = Number(b.duration) || 0;
-          return durationB - durationA;
-        });
-      case "difficulty-easy":
-        return sortedPackages.sort((a, b) => {
-          const order = { EASY: 1, MEDIUM: 2, TOUGH: 3, VERY_TOUGH: 4 };
-          return (order[a.difficulty] || 4) - (order[b.difficulty] || 4);
-        });
-      case "difficulty-hard":
-        return sortedPackages.sort((a, b) => {
-          const order = { EASY: 4, MEDIUM: 3, TOUGH: 2, VERY_TOUGH: 1 };
-          return (order[a.difficulty] || 1) - (order[b.difficulty] || 1);
-        });
-      default:
-        return sortedPackages;
-    }
-  };
+    let ignore = false;
+    const params = new URLSearchParams();
+    if (search) params.set("search", search);
+    if (difficulty !== "All Levels") params.set("difficulty", difficulty);
+    if (duration < 100) params.set("max_duration", duration);
+    if (priceRange < 10000) params.set("max_price", priceRange);
+
+    fetch(`http://localhost:8000/api/packages/facets/?${params}`)
+      .then((response) => (response.ok ? response.json() : null))
+      .then((data) => {
+        if (!ignore) setFacets(data);
+      })
+      .catch(() => {
+        if (!ignore) setFacets(null);
+      });
+    return () => {
+      ignore = true;
+    };
+  }, [search, difficulty, duration, priceRange]);
 
-  const filterPackages = () => {
-    return packages.filter((pkg) => {
-      const matchesSearch =
-        pkg.title && typeof pkg.title === "string"
-          ? pkg.title.toLowerCase().includes(search.toLowerCase())
-          : false;
-      const matchesRegion =
-        region === "All Regions" || (pkg.region && pkg.region === region);
-      const matchesDifficulty =
-        difficulty === "All Levels" ||
-        (pkg.difficulty &&
-          pkg.difficulty.toLowerCase() === difficulty.toLowerCase());
-      const matchesDuration = Number(pkg.duration) <= duration;
-      const matchesPrice = Number(pkg.price) <= priceRange;
-      return (
-        matchesSearch &&
-        matchesRegion &&
-        matchesDifficulty &&
-        matchesDuration &&
-        matchesPrice
-      );
-    });
-  };
+  const difficultyLabel = (level, label) =>
+    facets ? `${label} (${facets.difficulty[level] ?? 0})` : label;
 
-  const filteredPackages = sortPackages(filterPackages());
+  // Packages carry no region yet, so this filter stays client-side
+  const displayPackages = packages.filter(
+    (pkg) => region === "All Regions" || (pkg.region && pkg.region === region)
+  );
 
   // Pagination calculations
-  const totalPages = Math.ceil(filteredPackages.length / packagesPerPage);
+  const totalPages = Math.ceil(totalCount / packagesPerPage);
   const startIndex = (currentPage - 1) * packagesPerPage;
   const endIndex = startIndex + packagesPerPage;
-  const displayPackages = filteredPackages.slice(startIndex, endIndex);
 
   const isFilterApplied = () => {
     return (
@@ -434,10 +411,12 @@ const PackageList = () => {
                     onChange={(e) => setDifficulty(e.target.value)}
                   >
                     <option value="All Levels">All Levels</option>
-                    <option value="EASY">Easy</option>
-                    <option value="MEDIUM">Medium</option>
-                    <option value="TOUGH">Tough</option>
-                    <option value="VERY_TOUGH">Very Tough</option>
+                    <option value="EASY">{difficultyLabel("EASY", "Easy")}</option>
+                    <option value="MEDIUM">{difficultyLabel("MEDIUM", "Medium")}</option>
+                    <option value="TOUGH">{difficultyLabel("TOUGH", "Tough")}</option>
+                    <option value="VERY_TOUGH">
+                      {difficultyLabel("VERY_TOUGH", "Very Tough")}
+                    </option>
                   </select>
                 </div>
 
@@ -501,8 +480,8 @@ const PackageList = () => {
           <div className="flex flex-col sm:flex-row justify-between items-start sm:items-center mb-6 gap-4">
             <p className="text-gray-600">
               Showing {startIndex + 1}-
-              {Math.min(endIndex, filteredPackages.length)} of{" "}
-              {filteredPackages.length} packages
+              {Math.min(endIndex, totalCount)} of{" "}
+              {totalCount} packages
             </p>
             {totalPages > 1 && (
               <p className="text-sm text-gray-500">
@@ -528,7 +507,7 @@ const PackageList = () => {
         )}
 
         {/* No Results */}
-        {!isLoading && filteredPackages.length === 0 && !error && (
+        {!isLoading && displayPackages.length === 0 && !error && (
           <div className="text-center py-12">
             <ExclamationCircleIcon className="h-16 w-16 text-gray-400 mx-auto mb-4" />
             <h3 className="text-xl font-semibold text-gray-900 mb-2">
@@ -13,7 +13,7 @@ import { useNavigate } from "react-router-dom";
 import { useAuth } from "../contexts/AuthContext";
 
 const Profile = () => {
-  const { user, logout, updateUser } = useAuth();
+  const { user, logout, updateUser, authFetch } = useAuth();
   const navigate = useNavigate();
   const [activeTab, setActiveTab] = useState("profile");
   const [isLoading, setIsLoading] = useState(false);
@@ -274,13 +274,12 @@ const Profile = () => {
     setIsLoading(true);
     try {
       // API call to update profile
-      const response = await fetch(
+      const response = await authFetch(
         "http://localhost:8000/api/profile/update/",
         {
           method: "PUT",
           headers: {
             "Content-Type": "application/json",
-            Authorization: `Token ${localStorage.getItem("authToken")}`,
           },
           body: JSON.stringify(profileData),
         }
@@ -313,13 +312,12 @@ const Profile = () => {
     setIsLoading(true);
     try {
       // API call to update notification settings
-      const response = await fetch(
+      const response = await authFetch(
         "http://localhost:8000/api/profile/notifications/",
         {
           method: "PUT",
           headers: {
             "Content-Type": "application/json",
-            Authorization: `Token ${localStorage.getItem("authToken")}`,
           },
           body: JSON.stringify(notificationSettings),
         }
@@ -357,13 +355,12 @@ const Profile = () => {
     setIsLoading(true);
     try {
       // API call to change password
-      const response = await fetch(
+      const response = await authFetch(
         "http://localhost:8000/api/profile/change-password/",
         {
           method: "POST",
           headers: {
             "Content-Type": "application/json",
-            Authorization: `Token ${localStorage.getItem("authToken")}`,
           },
           body: JSON.stringify({
             current_password: securityData.current_password,
@@ -373,6 +370,11 @@ const Profile = () => {
       );
 
       if (response.ok) {
+        // Every earlier token was revoked; keep this session on the new pair
+        const data = await response.json();
+        localStorage.setItem("authToken", data.token);
+        localStorage.setItem("refreshToken", data.refresh);
+
         setSuccessMessage("Password changed successfully!");
         setSecurityData({
           current_password: "",
@@ -1,10 +1,12 @@
-import { createContext, useContext, useEffect, useState } from "react";
+import { createContext, useContext, useEffect, useRef, useState } from "react";
 
 const AuthContext = createContext();
 
 export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
+  // One refresh at a time; concurrent 401s wait on the same request
+  const refreshing = useRef(null);
 
   useEffect(() => {
     const token = localStorage.getItem("authToken");
@@ -18,6 +20,7 @@ export const AuthProvider = ({ children }) => {
         console.error("Error parsing user data:", error);
         // Clear invalid data
         localStorage.removeItem("authToken");
+        localStorage.removeItem("refreshToken");
         localStorage.removeItem("userData");
       }
     }
@@ -38,8 +41,9 @@ export const AuthProvider = ({ children }) => {
       if (response.ok) {
         const data = await response.json();
 
-        // Store token and user data
+        // Store the JWT pair and user data
         localStorage.setItem("authToken", data.token);
+        localStorage.setItem("refreshToken", data.refresh);
         localStorage.setItem("userData", JSON.stringify(data.user));
 
         // Set user state with complete data
@@ -65,8 +69,12 @@ export const AuthProvider = ({ children }) => {
         await fetch("http://localhost:8000/api/auth/logout/", {
           method: "POST",
           headers: {
-            Authorization: `Token ${token}`,
+            "Content-Type": "application/json",
+            Authorization: `Bearer ${token}`,
           },
+          body: JSON.stringify({
+            refresh: localStorage.getItem("refreshToken"),
+          }),
         });
       }
     } catch (error) {
@@ -74,11 +82,61 @@ export const AuthProvider = ({ children }) => {
     } finally {
       // Clear local storage and state regardless of API call success
       localStorage.removeItem("authToken");
+      localStorage.removeItem("refreshToken");
       localStorage.removeItem("userData");
       setUser(null);
     }
   };
 
+  // Swap the refresh token for a new pair; false when it is missing or rejected
+  const refreshTokens = () => {
+    if (!refreshing.current) {
+      refreshing.current = (async () => {
+        const refresh = localStorage.getItem("refreshToken");
+        if (!refresh) return false;
+        try {
+          const response = await fetch("http://localhost:8000/api/token/refresh", {
+            method: "POST",
+            headers: {
+              "Content-Type": "application/json",
+            },
+            body: JSON.stringify({ refresh }),
+          });
+          if (!response.ok) return false;
+          const data = await response.json();
+          localStorage.setItem("authToken", data.access);
+          localStorage.setItem("refreshToken", data.refresh);
+          return true;
+        } catch (error) {
+          console.error("Token refresh error:", error);
+          return false;
+        }
+      })().finally(() => {
+        refreshing.current = null;
+      });
+    }
+    return refreshing.current;
+  };
+
+  // fetch() with the access token; on a 401 refresh the pair and retry once,
+  // and log out when the refresh itself fails
+  const authFetch = async (url, options = {}) => {
+    const send = () =>
+      fetch(url, {
+        ...options,
+        headers: {
+          ...options.headers,
+          Authorization: `Bearer ${localStorage.getItem("authToken")}`,
+        },
+      });
+
+    const response = await send();
+    if (response.status !== 401) return response;
+    if (await refreshTokens()) return send();
+    await logout();
+    return response;
+  };
+
   const updateUser = (updatedUserData) => {
     setUser(updatedUserData);
     localStorage.setItem("userData", JSON.stringify(updatedUserData));
@@ -89,6 +147,7 @@ export const AuthProvider = ({ children }) => {
     login,
     logout,
     updateUser,
+    authFetch,
     isLoading, // Expose loading state
   };
 